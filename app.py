@@ -1,13 +1,37 @@
+import logging
+
+# imported first so the startup report covers the other imports
+from src.startup import log_startup_report, mark
+
 from dash import Dash, html, dcc
 import dash
 import dash_bootstrap_components as dbc
 
+from src.jobs import background_manager
+from src.metrics import register_metrics
+from src.payloads import register_compression
+from src.static_figures import register_routes as register_figure_routes
+from src.wordcloud_images import register_routes
+
+logging.basicConfig(level=logging.INFO)
+mark('imports')
+
 app = dash.Dash(__name__, 
                 external_stylesheets=[
                     dbc.themes.BOOTSTRAP,
                     'https://cdnjs.cloudflare.com/ajax/libs/font-awesome/5.15.4/css/all.min.css'
                 ],
-                use_pages=True)
+                use_pages=True,
+                # otherwise the pages router calls every page's layout to validate callbacks
+                suppress_callback_exceptions=True,
+                background_callback_manager=background_manager())
+mark('pages')
+
+register_routes(app.server)
+register_figure_routes(app.server)
+register_metrics(app)
+# after_request hooks run last-registered first: compress before metrics are recorded
+register_compression(app)
 
 app.layout = html.Div(style={'backgroundColor': 'black', 'minHeight': '100vh'}, children=[
     html.Div(style={
@@ -90,6 +114,8 @@ app.layout = html.Div(style={'backgroundColor': 'black', 'minHeight': '100vh'},
     ]),
     dash.page_container
 ])
+mark('layout')
+log_startup_report()
 
 if __name__ == '__main__':
     app.run(debug=True)
\ No newline at end of file
@@ -0,0 +1,20 @@
+// Loads figures served by src/static_figures.py into their graphs.
+//
+// The layout only carries the figure's URL. The response is immutable, so
+// the browser's HTTP cache answers repeat visits without a download.
+
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    figures: {
+        load: function (url) {
+            if (!url) {
+                return window.dash_clientside.no_update;
+            }
+            return fetch(url).then((response) => {
+                if (!response.ok) {
+                    throw new Error(`${url}: ${response.status}`);
+                }
+                return response.json();
+            });
+        }
+    }
+});
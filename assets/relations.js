@@ -0,0 +1,211 @@
+// In-browser filtering for the Correlations page (pages/relations.py).
+//
+// The page ships every row's numeric columns and category codes once, as
+// base64 typed arrays (src/correlations.py: client_dataset). Slider drags and
+// filter changes are then answered here without a server round trip. In
+// server mode this callback only forwards the request to update_plot, tagged
+// so that the server can skip requests a newer one has replaced (src/coalescing.py).
+
+(function () {
+    const TYPED_ARRAYS = {
+        i1: Int8Array, u1: Uint8Array, i2: Int16Array, u2: Uint16Array,
+        i4: Int32Array, u4: Uint32Array, f4: Float32Array, f8: Float64Array
+    };
+
+    // decoded columns of the last dataset received
+    let decoded = {source: null};
+
+    // tags server requests so that the server can drop superseded ones
+    const session = Math.random().toString(36).slice(2);
+    let seq = 0;
+
+    function decode(array) {
+        const binary = atob(array.bdata);
+        const bytes = new Uint8Array(binary.length);
+        for (let i = 0; i < binary.length; i++) {
+            bytes[i] = binary.charCodeAt(i);
+        }
+        return new TYPED_ARRAYS[array.dtype](bytes.buffer);
+    }
+
+    function columns(data) {
+        if (decoded.source !== data) {
+            const decodeAll = (arrays) => Object.fromEntries(
+                Object.entries(arrays).map(([col, array]) => [col, decode(array)])
+            );
+            decoded = {
+                source: data,
+                columns: decodeAll(data.columns),
+                codes: decodeAll(data.codes),
+                ids: decode(data.ids)
+            };
+        }
+        return decoded;
+    }
+
+    function axisTitle(col) {
+        return col.split('_').map((word) => word.charAt(0).toUpperCase() + word.slice(1)).join(' ');
+    }
+
+    function paragraph(text) {
+        return {namespace: 'dash_html_components', type: 'P', props: {children: text}};
+    }
+
+    function correlation(x, y) {
+        const n = x.length;
+        let sx = 0, sy = 0;
+        for (let i = 0; i < n; i++) {
+            sx += x[i];
+            sy += y[i];
+        }
+        const mx = sx / n, my = sy / n;
+        let sxy = 0, sxx = 0, syy = 0;
+        for (let i = 0; i < n; i++) {
+            const dx = x[i] - mx, dy = y[i] - my;
+            sxy += dx * dy;
+            sxx += dx * dx;
+            syy += dy * dy;
+        }
+        return sxy / Math.sqrt(sxx * syy);
+    }
+
+    function extent(values) {
+        let lo = Infinity, hi = -Infinity;
+        for (let i = 0; i < values.length; i++) {
+            lo = Math.min(lo, values[i]);
+            hi = Math.max(hi, values[i]);
+        }
+        return [lo, hi];
+    }
+
+    function filterPlot(n_clicks, duration_range, views_range, likes_range, mode, data,
+                        x_axis, y_axis, color_by, scale, claim_status, verified_status, ban_status) {
+        const no_update = window.dash_clientside.no_update;
+        if (mode !== 'client') {
+            // a fresh value on every call re-runs the server callback
+            seq++;
+            return [no_update, no_update, {session: session, seq: seq}];
+        }
+        if (!data) {
+            // the dataset is still on its way; its arrival re-runs this callback
+            return [no_update, no_update, no_update];
+        }
+
+        const {columns: cols, codes, ids} = columns(data);
+        const n = data.rows;
+        const keep = new Uint8Array(n).fill(1);
+
+        const ranges = [
+            ['video_duration_sec', duration_range],
+            ['video_view_count', views_range],
+            ['video_like_count', likes_range]
+        ];
+        for (const [col, range] of ranges) {
+            if (!range) {
+                continue;
+            }
+            const values = cols[col];
+            for (let i = 0; i < n; i++) {
+                if (values[i] < range[0] || values[i] > range[1]) {
+                    keep[i] = 0;
+                }
+            }
+        }
+
+        const selections = [
+            ['claim_status', claim_status],
+            ['verified_status', verified_status],
+            ['author_ban_status', ban_status]
+        ];
+        for (const [col, selected] of selections) {
+            if (!selected || !selected.length) {
+                continue;
+            }
+            const allowed = data.categories[col].map((value) => selected.includes(value));
+            const values = codes[col];
+            for (let i = 0; i < n; i++) {
+                if (!allowed[values[i]]) {
+                    keep[i] = 0;
+                }
+            }
+        }
+
+        let count = 0;
+        for (let i = 0; i < n; i++) {
+            count += keep[i];
+        }
+
+        if (count === 0) {
+            const empty = {data: [], layout: Object.assign({}, data.layout, {
+                title: {text: 'No data available for selected filters'}
+            })};
+            return [empty, 'No data available for the selected filters', no_update];
+        }
+
+        // one trace per category in category order, as the server draws them
+        const groups = color_by !== 'none' ? codes[color_by] : null;
+        const names = groups ? data.categories[color_by] : [null];
+        const sizes = new Array(names.length).fill(0);
+        for (let i = 0; i < n; i++) {
+            if (keep[i]) {
+                sizes[groups ? groups[i] : 0]++;
+            }
+        }
+        const traces = names.map((name, g) => ({
+            x: new Float64Array(sizes[g]),
+            y: new Float64Array(sizes[g]),
+            customdata: new Float64Array(sizes[g]),
+            filled: 0,
+            name: name,
+            color: name === null ? data.marker_color : data.palette[g % data.palette.length]
+        }));
+        const xs = new Float64Array(count), ys = new Float64Array(count);
+        const xValues = cols[x_axis], yValues = cols[y_axis];
+        for (let i = 0, j = 0; i < n; i++) {
+            if (!keep[i]) {
+                continue;
+            }
+            const trace = traces[groups ? groups[i] : 0];
+            trace.x[trace.filled] = xs[j] = xValues[i];
+            trace.y[trace.filled] = ys[j] = yValues[i];
+            trace.customdata[trace.filled] = ids[i];
+            trace.filled++;
+            j++;
+        }
+
+        const hovertemplate = `${axisTitle(x_axis)}: %{x:,}<br>${axisTitle(y_axis)}: %{y:,}<extra></extra>`;
+        const figureData = traces.filter((trace) => trace.filled > 0).map((trace) => ({
+            type: 'scattergl',
+            mode: 'markers',
+            x: trace.x,
+            y: trace.y,
+            customdata: trace.customdata,
+            name: trace.name === null ? '' : trace.name,
+            showlegend: trace.name !== null,
+            marker: {color: trace.color},
+            hovertemplate: hovertemplate
+        }));
+
+        const axisType = scale === 'log' ? 'log' : 'linear';
+        const layout = Object.assign({}, data.layout, {
+            xaxis: {title: {text: axisTitle(x_axis)}, type: axisType},
+            yaxis: {title: {text: axisTitle(y_axis)}, type: axisType},
+            legend: {title: {text: groups ? (data.color_titles[color_by] || '') : ''}}
+        });
+
+        const [xMin, xMax] = extent(xs);
+        const [yMin, yMax] = extent(ys);
+        const corr = correlation(xs, ys) * 100;
+        const summary = [
+            paragraph(`Total points: ${count}`),
+            paragraph(`X-Axis: ${xMin.toFixed(2)} to ${xMax.toFixed(2)}`),
+            paragraph(`Y-Axis: ${yMin.toFixed(2)} to ${yMax.toFixed(2)}`),
+            paragraph(Number.isFinite(corr) ? `Correlation: ${corr.toFixed(3)}%` : 'Correlation: Could not calculate')
+        ];
+        return [{data: figureData, layout: layout}, summary, no_update];
+    }
+
+    window.dash_clientside = Object.assign({}, window.dash_clientside, {
+        relations: {filter_plot: filterPlot}
+    });
+})();
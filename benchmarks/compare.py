@@ -0,0 +1,73 @@
+"""Compare two benchmark result files case by case.
+
+    python -m benchmarks.compare BASELINE.json CANDIDATE.json [--fail-above RATIO]
+
+Cases are matched on (case, rows, selection). Prints median time, peak
+allocation and payload size side by side with the candidate/baseline ratio.
+With `--fail-above`, exits non-zero if any median time ratio exceeds it.
+"""
+import argparse
+import json
+import sys
+
+
+def load_records(path):
+    with open(path) as f:
+        results = json.load(f)
+    return results['environment'], {
+        (r['case'], r['rows'], r['selection']): r for r in results.get('records', [])
+    }
+
+
+def ratio(new, old):
+    if new is None or old in (None, 0):
+        return None
+    return new / old
+
+
+def fmt_ratio(value):
+    return '' if value is None else f"{value:6.2f}x"
+
+
+def compare(baseline, candidate, fail_above=None):
+    env_a, old = load_records(baseline)
+    env_b, new = load_records(candidate)
+    print(f"baseline  {(env_a.get('commit') or '?')[:10]}  {env_a.get('time')}")
+    print(f"candidate {(env_b.get('commit') or '?')[:10]}  {env_b.get('time')}")
+    print(f"{'case':<22} {'rows':>11} {'selection':<13} {'base ms':>10} {'cand ms':>10} "
+          f"{'time':>7} {'peak':>7} {'payload':>7}")
+
+    regressions = []
+    for key in sorted(old.keys() & new.keys(), key=lambda k: (k[0], k[1], k[2] or '')):
+        a, b = old[key], new[key]
+        time_ratio = ratio(b['median_s'], a['median_s'])
+        case, rows, selection = key
+        print(
+            f"{case:<22} {rows:>11,} {selection or '':<13} {a['median_s'] * 1e3:>10.2f} "
+            f"{b['median_s'] * 1e3:>10.2f} {fmt_ratio(time_ratio):>7} "
+            f"{fmt_ratio(ratio(b['peak_alloc_mb'], a['peak_alloc_mb'])):>7} "
+            f"{fmt_ratio(ratio(b['payload_bytes'], a['payload_bytes'])):>7}"
+        )
+        if fail_above is not None and time_ratio is not None and time_ratio > fail_above:
+            regressions.append(key)
+
+    missing = old.keys() ^ new.keys()
+    if missing:
+        print(f"{len(missing)} cases only in one file")
+    if regressions:
+        print(f"{len(regressions)} cases slower than {fail_above}x")
+        return 1
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files.")
+    parser.add_argument('baseline')
+    parser.add_argument('candidate')
+    parser.add_argument('--fail-above', type=float, help="exit 1 if a median time ratio exceeds this")
+    args = parser.parse_args()
+    sys.exit(compare(args.baseline, args.candidate, args.fail_above))
+
+
+if __name__ == '__main__':
+    main()
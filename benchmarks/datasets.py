@@ -0,0 +1,58 @@
+"""Benchmark inputs of any size, synthetic or resampled from the real dataset.
+
+Synthetic inputs come from `src.synthetic` and need no scrape on disk.
+Resampled inputs draw rows with replacement from the complete rows of
+`data/tiktok_dataset.csv`, so the category mix, count distributions and
+transcripts are the real scrape's at every scale; each row gets a fresh
+`video_id`. Files are written in chunks and kept under `benchmarks/.data/`,
+so each (inputs, size, seed) combination is generated once.
+"""
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from src.data import DATA_PATH, read_raw
+from src.schema import COUNT_COLUMNS, ID_COLUMN
+from src.synthetic import write_dataset
+
+DATA_DIR = Path(__file__).resolve().parent / '.data'
+
+CHUNK_ROWS = 1_000_000
+
+# synthetic ids start past the real ones so the two never collide
+ID_OFFSET = 10 ** 11
+
+
+def dataset_path(n_rows, seed=0, inputs='synthetic'):
+    """Path of the `n_rows` benchmark input for `seed`, writing it if needed."""
+    if inputs == 'synthetic':
+        path = DATA_DIR / f'synthetic-{n_rows}-s{seed}.csv'
+        if not path.exists():
+            write_dataset(path, n_rows, seed)
+        return path
+    path = DATA_DIR / f'tiktok-{n_rows}-s{seed}.csv'
+    if not path.exists():
+        write_resampled(path, n_rows, seed)
+    return path
+
+
+def write_resampled(path, n_rows, seed=0, source=DATA_PATH):
+    rng = np.random.default_rng(seed)
+    base = read_raw(source).dropna(subset=['claim_status'] + COUNT_COLUMNS).reset_index(drop=True)
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f'.{path.name}.{os.getpid()}.tmp')
+    try:
+        with open(tmp, 'w', newline='') as f:
+            for start in range(0, n_rows, CHUNK_ROWS):
+                size = min(CHUNK_ROWS, n_rows - start)
+                chunk = base.iloc[rng.integers(0, len(base), size)]
+                chunk = chunk.assign(**{ID_COLUMN: ID_OFFSET + np.arange(start, start + size)})
+                chunk.index = pd.RangeIndex(start + 1, start + size + 1, name='#')
+                chunk.to_csv(f, header=start == 0)
+        os.replace(tmp, path)
+    finally:
+        tmp.unlink(missing_ok=True)
+    return path
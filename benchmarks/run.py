@@ -0,0 +1,276 @@
+"""Benchmark the dashboard's hot paths across dataset sizes and filters.
+
+    python -m benchmarks.run [--sizes N ...] [--full] [--repeats R] [--cases NAME ...] [--inputs KIND]
+
+Each size runs in its own worker process, with `TIKTOK_DATA_PATH` pointing at
+a synthetic or resampled input (see `benchmarks.datasets`), so loader caches and peak RSS
+are per size. Every case is called once to warm up and then timed `repeats`
+times. A further call runs under `tracemalloc` to get the peak allocated
+memory, and the result is serialized as Dash would send it to get the
+payload size.
+
+Results go to `benchmarks/results/<utc time>-<commit>.json`. Compare two runs
+with `python -m benchmarks.compare`.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+
+RESULTS_DIR = Path(__file__).resolve().parent / 'results'
+
+DEFAULT_SIZES = [19_084, 100_000, 1_000_000]
+FULL_SIZES = DEFAULT_SIZES + [10_000_000]
+
+# name -> (categorical selections, numeric ranges), from no filter to very narrow
+SELECTIONS = {
+    'all': ({}, {}),
+    'claim': ({'claim_status': ['claim']}, {}),
+    'claim_banned': ({'claim_status': ['claim'], 'author_ban_status': ['banned']}, {}),
+    'narrow': (
+        {'claim_status': ['claim'], 'verified_status': ['verified'], 'author_ban_status': ['banned']},
+        {'video_view_count': [0, 9_999]}
+    ),
+}
+
+CASES = ['load_rows', 'build_indexes', 'sankey_rows', 'sankey_counts', 'duration_kde',
+         'update_plot', 'update_wordcloud_cold', 'update_wordcloud_warm']
+
+
+def measure(func, repeats):
+    """Warm-up call, `repeats` timed calls, then one call under tracemalloc."""
+    func()
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, {
+        'median_s': statistics.median(times),
+        'min_s': min(times),
+        'max_s': max(times),
+        'peak_alloc_mb': peak / 2**20
+    }
+
+
+def payload_bytes(result):
+    from plotly.io.json import to_json_plotly
+    return len(to_json_plotly(result).encode())
+
+
+def run_worker(cases, repeats):
+    """Run `cases` against the dataset at `TIKTOK_DATA_PATH`; returns records."""
+    import logging
+    logging.basicConfig(level=logging.WARNING)
+
+    import app  # noqa: F401  registers the pages whose callbacks are timed
+    from src.cache import read_rows
+    from src.content_journey_sankey import build_sankey_figure
+    from src.data import load_dataset, snapshot_path
+    from src.duration_content_type_kde import build_duration_figure
+    from src.indexes import BitmapIndex, SortedRangeIndex, filter_rows
+    from src.sankey import create_sankey_figure
+    from src.startup import memory_mb
+    from src.wordcloud_images import render_wordcloud, wordcloud_cache
+    relations = sys.modules['pages.relations']
+    wordcloud = sys.modules['pages.wordcloud']
+
+    snapshot = snapshot_path()[0]
+    df = load_dataset()
+    n_rows = len(df)
+    records = []
+
+    def record(case, func, selection=None, rows=None, **extra):
+        result, timing = measure(func, repeats)
+        records.append({
+            'case': case,
+            'rows': n_rows,
+            'selection': selection,
+            'selectivity': None if rows is None else len(rows) / n_rows,
+            'repeats': repeats,
+            **timing,
+            'payload_bytes': payload_bytes(result) if result is not None else None,
+            **extra
+        })
+        return result
+
+    def load_rows():
+        read_rows(snapshot)
+
+    def build_indexes():
+        BitmapIndex(df)
+        SortedRangeIndex(df)
+
+    if 'load_rows' in cases:
+        record('load_rows', load_rows)
+    if 'build_indexes' in cases:
+        record('build_indexes', build_indexes)
+    if 'sankey_rows' in cases:
+        record('sankey_rows', lambda: create_sankey_figure(df))
+    if 'sankey_counts' in cases:
+        record('sankey_counts', build_sankey_figure)
+
+    for name, (selections, ranges) in SELECTIONS.items():
+        claim, verified, ban = (selections.get(col) or [] for col in
+                                ('claim_status', 'verified_status', 'author_ban_status'))
+
+        if 'duration_kde' in cases:
+            # the page's KDE only filters on segment columns
+            record('duration_kde', lambda: build_duration_figure('claim_status', selections),
+                   name, filter_rows(selections, {}))
+
+        rows = filter_rows(selections, ranges)
+        if 'update_plot' in cases:
+            record('update_plot', lambda: relations.update_plot(
+                1, None, ranges.get('video_view_count'), None,
+                'video_view_count', 'video_like_count', 'claim_status', 'linear', claim, verified, ban
+            ), name, rows)
+
+        def update_wordcloud():
+            children, job = wordcloud.update_wordcloud(
+                1, claim, verified, ban, None, ranges.get('video_view_count'), None, None, None, None
+            )
+            if isinstance(job, dict):
+                # a cache miss: run the background job inline
+                children = wordcloud.generate_wordcloud(lambda progress: None, job)
+            return children
+
+        def render_wordcloud_cold():
+            # what a cache miss runs; any cache would turn repeats into hits
+            render_wordcloud(filter_rows(selections, ranges))
+
+        if 'update_wordcloud_cold' in cases:
+            record('update_wordcloud_cold', render_wordcloud_cold, name, rows)
+        if 'update_wordcloud_warm' in cases:
+            result = record('update_wordcloud_warm', update_wordcloud, name, rows)
+            records[-1]['image_bytes'] = image_size(wordcloud_cache, result)
+
+    return {'rows': n_rows, 'peak_rss_mb': peak_rss_mb(), 'memory_mb': memory_mb(), 'records': records}
+
+
+def image_size(cache, result):
+    """Bytes of the word cloud image a callback result points at, if any."""
+    src = getattr(result, 'src', None)
+    if not src:
+        return None
+    key = Path(src).stem
+    image = cache.get(key)
+    return len(image) if image else None
+
+
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == 'darwin' else peak / 2**10
+
+
+def git_commit():
+    root = Path(__file__).resolve().parent.parent
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=root, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=root,
+                                    capture_output=True, text=True, check=True).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+    return commit, dirty
+
+
+def environment():
+    import numpy
+    import pandas
+    import plotly
+
+    commit, dirty = git_commit()
+    return {
+        'commit': commit,
+        'dirty': dirty,
+        'time': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'numpy': numpy.__version__,
+        'pandas': pandas.__version__,
+        'plotly': plotly.__version__,
+    }
+
+
+def run(sizes, cases, repeats, seed=0, out=None, inputs='synthetic'):
+    from benchmarks.datasets import dataset_path
+
+    results = {'environment': environment(), 'sizes': sizes, 'repeats': repeats,
+               'seed': seed, 'inputs': inputs, 'workers': []}
+    for size in sizes:
+        path = dataset_path(size, seed, inputs)
+        print(f"benchmarking {size:,} rows ({path.name})", file=sys.stderr)
+        env = {**os.environ, 'TIKTOK_DATA_PATH': str(path)}
+        completed = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.run', '--worker', '--repeats', str(repeats),
+             '--cases', *cases],
+            env=env, stdout=subprocess.PIPE, text=True, check=True,
+            cwd=Path(__file__).resolve().parent.parent
+        )
+        worker = json.loads(completed.stdout.strip().splitlines()[-1])
+        results['workers'].append({'size': size, **{k: v for k, v in worker.items() if k != 'records'}})
+        results.setdefault('records', []).extend(worker['records'])
+        print_records(worker['records'])
+
+    if out is None:
+        stamp = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+        commit = (results['environment']['commit'] or 'nogit')[:10]
+        out = RESULTS_DIR / f'{stamp}-{commit}.json'
+    out = Path(out)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(results, indent=2))
+    print(f"wrote {out}", file=sys.stderr)
+    return out
+
+
+def print_records(records):
+    for r in records:
+        selectivity = '' if r['selectivity'] is None else f"{r['selectivity']:6.1%}"
+        payload = '' if r['payload_bytes'] is None else f"{r['payload_bytes']:>11,} B"
+        print(
+            f"{r['case']:<22} {r['rows']:>11,} {r['selection'] or '':<13} {selectivity:>7} "
+            f"{r['median_s'] * 1e3:>10.2f} ms {r['peak_alloc_mb']:>9.1f} MB {payload}",
+            file=sys.stderr
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the dashboard's hot paths.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help="dataset sizes in rows")
+    parser.add_argument('--full', action='store_true', help=f"use sizes {FULL_SIZES}")
+    parser.add_argument('--repeats', type=int, default=5, help="timed calls per case")
+    parser.add_argument('--cases', nargs='+', choices=CASES, default=CASES, help="cases to run")
+    parser.add_argument('--inputs', choices=['synthetic', 'resample'], default='synthetic',
+                        help="generate inputs with src.synthetic or resample the real dataset")
+    parser.add_argument('--seed', type=int, default=0, help="seed for the inputs")
+    parser.add_argument('--out', help="results file (default: benchmarks/results/<time>-<commit>.json)")
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_worker(args.cases, args.repeats)))
+        return
+    run(FULL_SIZES if args.full else args.sizes, args.cases, args.repeats, args.seed, args.out, args.inputs)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,102 +1,201 @@
-from dash import dcc, html
-import plotly.graph_objects as go
-import numpy as np
-from scipy.stats import gaussian_kde
+from dash import dcc, html, Input, Output, callback, clientside_callback, ClientsideFunction
+import dash_bootstrap_components as dbc
 import dash
-import pandas as pd
 
-dash.register_page(__name__, name="Duration Dynamics", path="/duration-density")
-df = pd.read_csv('data/tiktok_dataset.csv')
-df = df[df['video_duration_sec'].notna() & df['claim_status'].isin(['claim', 'opinion'])]
-
-colors = {'claim': '#FF0050', 'opinion': '#00F2EA'}
+from src.duration_content_type_kde import build_duration_figure
+from src.payloads import compact_figure
+from src.schema import VIEW_TIER_COLUMN
+from src.segments import segment_histograms
+from src.startup import cached_layout
+from src.static_figures import PLACEHOLDER, figure_url
 
-fig_kde = go.Figure()
-
-for label in ['claim', 'opinion']:
-    subset = df[df['claim_status'] == label]['video_duration_sec']
-    kde = gaussian_kde(subset, bw_method=0.3)
-    x_vals = np.linspace(subset.min(), subset.max(), 500)
-    y_vals = kde(x_vals)
+dash.register_page(__name__, name="Duration Dynamics", path="/duration-density")
 
-    fig_kde.add_trace(go.Scatter(
-        x=x_vals,
-        y=y_vals,
-        mode='lines',
-        name=label.capitalize(),
-        line=dict(color=colors[label], width=3),
-        fill='tozeroy',
-        hovertemplate=f"{label.capitalize()}<br>Duration: %{{x:.1f}} sec<br>Density: %{{y:.4f}}<extra></extra>"
-    ))
+dropdown_style = {
+    'color': 'white',
+    'backgroundColor': 'black',
+    'borderColor': '#FF0050'
+}
 
-    median_val = subset.median()
+compare_options = [
+    {'label': 'Content Classification', 'value': 'claim_status'},
+    {'label': 'Verification Status', 'value': 'verified_status'},
+    {'label': 'Ban Status', 'value': 'author_ban_status'},
+    {'label': 'View Count Tier', 'value': VIEW_TIER_COLUMN},
+]
 
-    fig_kde.add_vline(
-        x=median_val,
-        line=dict(color=colors[label], width=2, dash='dash'),
-        annotation_text=f"{label.capitalize()} Median: {median_val:.1f}s",
-        annotation_position="top right" if label == 'claim' else "top left",
-        annotation_font=dict(color='white', family="Garamond", size=13),
-        annotation=dict(
-            bgcolor='rgba(0,0,0,0.5)',
-            bordercolor=colors[label],
-            borderwidth=1,
-            borderpad=4,
-            showarrow=False
-        ),
-        opacity=0.8
-)
+bandwidth_options = [
+    {'label': 'Custom factor', 'value': 'factor'},
+    {'label': "Scott's rule", 'value': 'scott'},
+    {'label': "Silverman's rule", 'value': 'silverman'},
+]
 
-fig_kde.update_layout(
-    font=dict(
-        family="Garamond",
-        color="white"
-    ),
-    autosize=False,
-    height=600,
-    xaxis_title="Video Duration (seconds)",
-    yaxis_title="Density",
-    template="plotly_dark",
-    plot_bgcolor='black',
-    paper_bgcolor='black'
-)
+def level_options(col):
+    return [{'label': str(level).title(), 'value': level} for level in segment_histograms().levels[col]]
 
+@cached_layout
+def layout():
+    return html.Div(className='main-container', children=[
+        html.H1("Claim videos are just as short, if not shorter, than opinion videos — and that’s what makes them dangerous.", style={'fontFamily': 'Garamond'}),
 
-layout = html.Div(className='main-container', children=[
-    html.H1("Claim videos are just as short, if not shorter, than opinion videos — and that’s what makes them dangerous.", style={'fontFamily': 'Garamond'}),
+        html.Div(style={
+            'display': 'flex',
+            'flexDirection': 'row',
+            'gap': '20px',
+            'alignItems': 'flex-start',
+            'flexWrap': 'wrap'
+        }, children=[
 
-    html.Div(style={
-        'display': 'flex',
-        'flexDirection': 'row',
-        'gap': '20px',
-        'alignItems': 'flex-start',
-        'flexWrap': 'wrap'
-    }, children=[
+            html.Div(className='text-info-box', style={
+                'flex': '1 1 300px',
+                'minWidth': '300px',
+                'maxWidth': '500px',
+                'height': '650px'
+            }, children=[
+                html.Div(className='text-info-header', children="Why It Matters"),
+                html.Div(className='text-info-content', children=[
+                    html.P("TikTok’s short-form format isn't just about entertainment — it compresses complex narratives into a matter of seconds."),
+                    html.P("As this density plot shows, there is virtually no difference in video length between content flagged as claims and that categorized as opinions."),
+                    html.P("In fact, some of the most potentially misleading content may be even shorter."),
+                    html.P("Because shorter content leaves less room for nuance, context, or rebuttal. Claims — especially false or unverifiable ones — thrive when viewers have no time to think critically."),
+                    html.P("With the average video duration clustering under a minute, TikTok makes it easy to absorb, believe, and move on."),
+                    html.P("This isn’t just a format choice. It’s a design that accelerates misinformation — at the speed of a swipe.")
+                ])
+            ]),
 
-        html.Div(className='text-info-box', style={
-            'flex': '1 1 300px',
-            'minWidth': '300px',
-            'maxWidth': '500px',
-            'height': '650px'
-        }, children=[
-            html.Div(className='text-info-header', children="Why It Matters"),
-            html.Div(className='text-info-content', children=[
-                html.P("TikTok’s short-form format isn't just about entertainment — it compresses complex narratives into a matter of seconds."),
-                html.P("As this density plot shows, there is virtually no difference in video length between content flagged as claims and that categorized as opinions."),
-                html.P("In fact, some of the most potentially misleading content may be even shorter."),
-                html.P("Because shorter content leaves less room for nuance, context, or rebuttal. Claims — especially false or unverifiable ones — thrive when viewers have no time to think critically."),
-                html.P("With the average video duration clustering under a minute, TikTok makes it easy to absorb, believe, and move on."),
-                html.P("This isn’t just a format choice. It’s a design that accelerates misinformation — at the speed of a swipe.")
+            html.Div(style={'flex': '2 1 800px'}, children=[
+                html.Div(className='filter-container', children=[
+                    dbc.Row([
+                        dbc.Col([
+                            html.Label("Compare By:"),
+                            dcc.Dropdown(
+                                id='duration-compare',
+                                options=compare_options,
+                                value='claim_status',
+                                clearable=False,
+                                className='axis-dropdown mb-3',
+                                style=dropdown_style,
+                            ),
+                        ], width=4),
+                        dbc.Col([
+                            html.Label("Bandwidth:"),
+                            dcc.Dropdown(
+                                id='duration-bw-method',
+                                options=bandwidth_options,
+                                value='factor',
+                                clearable=False,
+                                className='axis-dropdown mb-3',
+                                style=dropdown_style,
+                            ),
+                        ], width=4),
+                        dbc.Col([
+                            html.Label("Bandwidth Factor:"),
+                            dcc.Slider(
+                                id='duration-bw-factor',
+                                min=0.05,
+                                max=1,
+                                step=0.05,
+                                value=0.3,
+                                marks=None,
+                                tooltip={"placement": "bottom", "always_visible": True},
+                                className='tiktok-slider'
+                            ),
+                        ], width=4),
+                    ]),
+                    dbc.Row([
+                        dbc.Col([
+                            html.Label("Content Classification:"),
+                            dcc.Dropdown(
+                                id='duration-claim-filter',
+                                options=level_options('claim_status'),
+                                value=[],
+                                multi=True,
+                                className='multi-dropdown mb-3',
+                                style=dropdown_style,
+                            ),
+                        ], width=3),
+                        dbc.Col([
+                            html.Label("Verification Status:"),
+                            dcc.Dropdown(
+                                id='duration-verified-filter',
+                                options=level_options('verified_status'),
+                                value=[],
+                                multi=True,
+                                className='multi-dropdown mb-3',
+                                style=dropdown_style,
+                            ),
+                        ], width=3),
+                        dbc.Col([
+                            html.Label("Ban Status:"),
+                            dcc.Dropdown(
+                                id='duration-ban-filter',
+                                options=level_options('author_ban_status'),
+                                value=[],
+                                multi=True,
+                                className='multi-dropdown mb-3',
+                                style=dropdown_style,
+                            ),
+                        ], width=3),
+                        dbc.Col([
+                            html.Label("View Count Tier:"),
+                            dcc.Dropdown(
+                                id='duration-views-filter',
+                                options=level_options(VIEW_TIER_COLUMN),
+                                value=[],
+                                multi=True,
+                                className='multi-dropdown mb-3',
+                                style=dropdown_style,
+                            ),
+                        ], width=3),
+                    ]),
+                    dcc.Checklist(
+                        id='duration-overall',
+                        options=[{'label': ' Overlay all selected videos', 'value': 'overall'}],
+                        value=[],
+                    ),
+                ]),
+                dcc.Store(id='duration-url', data=figure_url('duration')),
+                dcc.Graph(
+                    id='duration-graph',
+                    figure=PLACEHOLDER,
+                    style={'height': '600px'},
+                    className='point-plot-graph',
+                    config={'displayModeBar': True},
+                )
             ])
-        ]),
-
-        html.Div(style={'flex': '2 1 800px'}, children=[
-            dcc.Graph(
-                figure=fig_kde,
-                style={'height': '600px'},
-                className='point-plot-graph',
-                config={'displayModeBar': True},
-            )
         ])
     ])
-])
+
+# the default figure is fetched from its cacheable URL rather than sent in the layout
+clientside_callback(
+    ClientsideFunction(namespace='figures', function_name='load'),
+    Output('duration-graph', 'figure'),
+    Input('duration-url', 'data')
+)
+
+@callback(
+    Output('duration-graph', 'figure', allow_duplicate=True),
+    [Input('duration-compare', 'value'),
+     Input('duration-bw-method', 'value'),
+     Input('duration-bw-factor', 'value'),
+     Input('duration-claim-filter', 'value'),
+     Input('duration-verified-filter', 'value'),
+     Input('duration-ban-filter', 'value'),
+     Input('duration-views-filter', 'value'),
+     Input('duration-overall', 'value')],
+    prevent_initial_call=True
+)
+def update_duration(compare_by, bw_method, bw_factor, claim_status, verified_status,
+                    ban_status, view_tier, overall):
+    selections = {
+        'claim_status': claim_status,
+        'verified_status': verified_status,
+        'author_ban_status': ban_status,
+        VIEW_TIER_COLUMN: view_tier
+    }
+    return compact_figure(build_duration_figure(
+        compare_by,
+        selections,
+        bw_method=bw_factor if bw_method == 'factor' else bw_method,
+        show_overall='overall' in (overall or [])
+    ))
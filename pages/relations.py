@@ -1,14 +1,29 @@
-from dash import dcc, html, Input, Output, callback, State
+from dash import dcc, html, Input, Output, callback, clientside_callback, ClientsideFunction, State
 import dash_bootstrap_components as dbc
-import plotly.express as px
 import plotly.graph_objects as go
-import pandas as pd
 import dash
+from dash.exceptions import PreventUpdate
 
-data = pd.read_csv('data/tiktok_dataset.csv')
+from src.coalescing import LatestRequests
+from src.correlations import CLIENT_FILTER_MAX_ROWS, client_dataset, correlation_figure, correlation_matrix_figure
+from src.data import column_summary, load_dataset, load_manifest
+from src.indexes import filter_rows, record_index
+from src.metrics import instrumented, stage
+from src.moments import segment_moments
+from src.payloads import compact_figure
+from src.startup import cached_layout
 
-def clean_dropdown_options(series):
-    return [{'label': str(s), 'value': s} for s in series.unique() if pd.notna(s)]
+def column_bounds(col):
+    # slider bounds come from the ingest summaries, not a column scan
+    summary = column_summary(col)
+    return int(summary['min']), int(summary['max'])
+
+# a slider drag queues a burst of requests; only the newest is computed
+plot_requests = LatestRequests('update_plot')
+
+def clean_dropdown_options(col):
+    # categories in order of first appearance, as stored at ingest
+    return [{'label': str(s), 'value': s} for s in load_manifest()['categories'][col]]
 
 allowed_metrics = [
     'video_duration_sec',
@@ -20,7 +35,7 @@ allowed_metrics = [
 ]
 
 numeric_options = [{'label': col.replace('_', ' ').title(), 'value': col} 
-                  for col in allowed_metrics if col in data.columns]
+                  for col in allowed_metrics]
 
 dash.register_page(__name__, path='/relations', name="Correlations")
 
@@ -49,206 +64,297 @@ hover_style = {
     'padding': '5px'
 }
 
-layout = html.Div([
-    html.H1("How are various engagement metrics correlated?", className="text-center"),
+@cached_layout
+def layout():
+    # small datasets are shipped to the browser and filtered there
+    client_filtering = load_manifest()['rows'] <= CLIENT_FILTER_MAX_ROWS
+    return html.Div([
+        html.H1("How are various engagement metrics correlated?", className="text-center"),
     
-    dbc.Row([
-        dbc.Col([
-            html.Div([
-                html.H3("Plot Controls", className="filter-header"),
+        dcc.Store(id='relations-data'),
+        dcc.Store(id='relations-query'),
+    
+        dbc.Row([
+            dbc.Col([
+                html.Div([
+                    html.H3("Plot Controls", className="filter-header"),
                 
-                html.Label("Select X-Axis:"),
-                dcc.Dropdown(
-                    id='x-axis-selector',
-                    options=numeric_options,
-                    value='video_view_count' if 'video_view_count' in data.columns else allowed_metrics[0],
-                    className='axis-dropdown mb-3',
-                    style=dropdown_style,
-                ),
+                    html.Label("Select X-Axis:"),
+                    dcc.Dropdown(
+                        id='x-axis-selector',
+                        options=numeric_options,
+                        value='video_view_count',
+                        className='axis-dropdown mb-3',
+                        style=dropdown_style,
+                    ),
                 
-                html.Label("Select Y-Axis:"),
-                dcc.Dropdown(
-                    id='y-axis-selector',
-                    options=numeric_options,
-                    value='video_like_count' if 'video_like_count' in data.columns else allowed_metrics[1],
-                    className='axis-dropdown mb-3',
-                    style=dropdown_style,
-                ),
+                    html.Label("Select Y-Axis:"),
+                    dcc.Dropdown(
+                        id='y-axis-selector',
+                        options=numeric_options,
+                        value='video_like_count',
+                        className='axis-dropdown mb-3',
+                        style=dropdown_style,
+                    ),
                 
-                html.Label("Color By:"),
-                dcc.Dropdown(
-                    id='color-selector',
-                    options=[
-                        {'label': 'None', 'value': 'none'},
-                        {'label': 'Content Classification', 'value': 'claim_status'},
-                        {'label': 'Verification Status', 'value': 'verified_status'},
-                        {'label': 'Ban Status', 'value': 'author_ban_status'},
-                    ],
-                    value='none',
-                    className='color-dropdown mb-4',
-                    style=dropdown_style,
-                ),
+                    html.Label("Color By:"),
+                    dcc.Dropdown(
+                        id='color-selector',
+                        options=[
+                            {'label': 'None', 'value': 'none'},
+                            {'label': 'Content Classification', 'value': 'claim_status'},
+                            {'label': 'Verification Status', 'value': 'verified_status'},
+                            {'label': 'Ban Status', 'value': 'author_ban_status'},
+                        ],
+                        value='none',
+                        className='color-dropdown mb-3',
+                        style=dropdown_style,
+                    ),
                 
-                html.Hr(className="filter-divider"),
+                    html.Label("Axis Scale:"),
+                    dcc.Dropdown(
+                        id='scale-selector',
+                        options=[
+                            {'label': 'Linear', 'value': 'linear'},
+                            {'label': 'Log', 'value': 'log'},
+                        ],
+                        value='linear',
+                        clearable=False,
+                        className='axis-dropdown mb-4',
+                        style=dropdown_style,
+                    ),
                 
-                html.H3("Data Filters", className="filter-header"),
+                    html.Label("Filtering:"),
+                    dcc.RadioItems(
+                        id='filter-mode',
+                        options=[
+                            {'label': 'In browser', 'value': 'client', 'disabled': not client_filtering},
+                            {'label': 'On server', 'value': 'server'},
+                        ],
+                        value='client' if client_filtering else 'server',
+                        inline=True,
+                        inputStyle={'marginRight': '5px', 'marginLeft': '10px'},
+                        className='mb-4',
+                    ),
                 
-                dbc.Row([
-                    dbc.Col([
-                        html.Label("Content Classification:"),
-                        dcc.Dropdown(
-                            id='claim-filter',
-                            options=clean_dropdown_options(data['claim_status']),
-                            value=[],
-                            multi=True,
-                            className='multi-dropdown mb-4',
-                            style=dropdown_style,
-                        ),
-                    ], width=6),
+                    html.Hr(className="filter-divider"),
+                
+                    html.H3("Data Filters", className="filter-header"),
+                
+                    dbc.Row([
+                        dbc.Col([
+                            html.Label("Content Classification:"),
+                            dcc.Dropdown(
+                                id='claim-filter',
+                                options=clean_dropdown_options('claim_status'),
+                                value=[],
+                                multi=True,
+                                className='multi-dropdown mb-4',
+                                style=dropdown_style,
+                            ),
+                        ], width=6),
                     
-                    dbc.Col([
-                        html.Label("Verification Status:"),
-                        dcc.Dropdown(
-                            id='verified-filter',
-                            options=clean_dropdown_options(data['verified_status']),
-                            value=[],
-                            multi=True,
-                            className='multi-dropdown mb-4',
-                            style=dropdown_style,
-                        ),
-                    ], width=6),
-                ], justify="center", className="mb-4"),
+                        dbc.Col([
+                            html.Label("Verification Status:"),
+                            dcc.Dropdown(
+                                id='verified-filter',
+                                options=clean_dropdown_options('verified_status'),
+                                value=[],
+                                multi=True,
+                                className='multi-dropdown mb-4',
+                                style=dropdown_style,
+                            ),
+                        ], width=6),
+                    ], justify="center", className="mb-4"),
                 
-                dbc.Row([
-                    dbc.Col([
-                        html.Label("Ban Status:"),
-                        dcc.Dropdown(
-                            id='ban-filter',
-                            options=clean_dropdown_options(data['author_ban_status']),
-                            value=[],
-                            multi=True,
-                            className='multi-dropdown mb-4',
-                            style=dropdown_style,
-                        ),
-                    ], width=6),
-                ], justify="center", className="mb-4"),
+                    dbc.Row([
+                        dbc.Col([
+                            html.Label("Ban Status:"),
+                            dcc.Dropdown(
+                                id='ban-filter',
+                                options=clean_dropdown_options('author_ban_status'),
+                                value=[],
+                                multi=True,
+                                className='multi-dropdown mb-4',
+                                style=dropdown_style,
+                            ),
+                        ], width=6),
+                    ], justify="center", className="mb-4"),
                 
-                dbc.Row([
-                    dbc.Col([
-                        html.Label("Video Duration (seconds):"),
-                        dcc.RangeSlider(
-                            id='duration-slider',
-                            min=data['video_duration_sec'].min(),
-                            max=data['video_duration_sec'].max(),
-                            step=1,
-                            value=[data['video_duration_sec'].min(), data['video_duration_sec'].max()],
-                            marks=None,
-                            tooltip={"placement": "bottom", "always_visible": True},
-                            className='tiktok-slider'
-                        ),
-                    ], width=12),
-                ], justify="center", className="mb-4"),
+                    dbc.Row([
+                        dbc.Col([
+                            html.Label("Video Duration (seconds):"),
+                            dcc.RangeSlider(
+                                id='duration-slider',
+                                min=column_bounds('video_duration_sec')[0],
+                                max=column_bounds('video_duration_sec')[1],
+                                step=1,
+                                value=list(column_bounds('video_duration_sec')),
+                                marks=None,
+                                tooltip={"placement": "bottom", "always_visible": True},
+                                className='tiktok-slider'
+                            ),
+                        ], width=12),
+                    ], justify="center", className="mb-4"),
                 
-                dbc.Row([
-                    dbc.Col([
-                        html.Label("Video Views:"),
-                        dcc.RangeSlider(
-                            id='views-slider',
-                            min=data['video_view_count'].min(),
-                            max=data['video_view_count'].max(),
-                            step=1000,
-                            value=[data['video_view_count'].min(), data['video_view_count'].max()],
-                            marks=None,
-                            tooltip={"placement": "bottom", "always_visible": True},
-                            className='tiktok-slider'
-                        ),
-                    ], width=12),
-                ], justify="center", className="mb-4"),
+                    dbc.Row([
+                        dbc.Col([
+                            html.Label("Video Views:"),
+                            dcc.RangeSlider(
+                                id='views-slider',
+                                min=column_bounds('video_view_count')[0],
+                                max=column_bounds('video_view_count')[1],
+                                step=1000,
+                                value=list(column_bounds('video_view_count')),
+                                marks=None,
+                                tooltip={"placement": "bottom", "always_visible": True},
+                                className='tiktok-slider'
+                            ),
+                        ], width=12),
+                    ], justify="center", className="mb-4"),
                 
-                dbc.Row([
-                    dbc.Col([
-                        html.Label("Video Likes:"),
-                        dcc.RangeSlider(
-                            id='likes-slider',
-                            min=data['video_like_count'].min(),
-                            max=data['video_like_count'].max(),
-                            step=1000,
-                            value=[data['video_like_count'].min(), data['video_like_count'].max()],
-                            marks=None,
-                            tooltip={"placement": "bottom", "always_visible": True},
-                            className='tiktok-slider'
-                        ),
-                    ], width=12),
-                ], justify="center", className="mb-4"),
+                    dbc.Row([
+                        dbc.Col([
+                            html.Label("Video Likes:"),
+                            dcc.RangeSlider(
+                                id='likes-slider',
+                                min=column_bounds('video_like_count')[0],
+                                max=column_bounds('video_like_count')[1],
+                                step=1000,
+                                value=list(column_bounds('video_like_count')),
+                                marks=None,
+                                tooltip={"placement": "bottom", "always_visible": True},
+                                className='tiktok-slider'
+                            ),
+                        ], width=12),
+                    ], justify="center", className="mb-4"),
                 
-                dbc.Row([
-                    dbc.Col([
-                        html.Button(
-                            'Update Plot', 
-                            id='update-plot-btn', 
-                            className='dash-button glitch-button generate-button'
-                        )
-                    ], width=12, className="text-center")
-                ], justify="center", className="mb-4"),
+                    dbc.Row([
+                        dbc.Col([
+                            html.Button(
+                                'Update Plot', 
+                                id='update-plot-btn', 
+                                className='dash-button glitch-button generate-button'
+                            )
+                        ], width=12, className="text-center")
+                    ], justify="center", className="mb-4"),
                 
-            ], className="filter-container", style={'width': '100%'})
-        ], width=6), 
+                ], className="filter-container", style={'width': '100%'})
+            ], width=6), 
         
-        dbc.Col([
-            html.Div([
-                dcc.Graph(
-                    id='point-plot',
-                    config={'displayModeBar': True, 'scrollZoom': True},
-                    className='point-plot-graph'
-                ),
+            dbc.Col([
                 html.Div([
-                    html.H3("Data Insights", className="text-info-header"),
-                    html.Div(id='data-summary', className="text-info-content")
+                    dcc.Graph(
+                        id='point-plot',
+                        config={'displayModeBar': True, 'scrollZoom': True},
+                        className='point-plot-graph'
+                    ),
+                    html.Div([
+                        html.H3("Data Insights", className="text-info-header"),
+                        html.Div(id='data-summary', className="text-info-content")
+                    ], className="text-info-box plot-insights-box"),
+                    html.Div([
+                        html.H3("Video Details", className="text-info-header"),
+                        html.Div(
+                            "Hover over a point to read its transcript",
+                            id='point-details',
+                            className="text-info-content"
+                        )
+                    ], className="text-info-box plot-insights-box")
+                ], className="plot-container")
+            ], width=6) 
+        ]),
+    
+        dbc.Row([
+            dbc.Col([
+                html.Div([
+                    html.H3("All Metrics", className="text-info-header"),
+                    html.P(
+                        "Pearson correlations between every pair of metrics for the selected "
+                        "classification, verification and ban status. The axis scale picks raw or log counts; "
+                        "the range sliders do not apply.",
+                        className="text-info-content"
+                    ),
+                    dcc.Graph(id='correlation-matrix', style={'height': '550px'})
                 ], className="text-info-box plot-insights-box")
-            ], className="plot-container")
-        ], width=6) 
-    ]),
-], className="main-container")
+            ], width=12)
+        ]),
+    ], className="main-container")
 
-@callback(
+# filters and plots in the browser, or hands the request to update_plot
+clientside_callback(
+    ClientsideFunction(namespace='relations', function_name='filter_plot'),
     [Output('point-plot', 'figure'),
-     Output('data-summary', 'children')],
+     Output('data-summary', 'children'),
+     Output('relations-query', 'data')],
     [Input('update-plot-btn', 'n_clicks'),
      Input('duration-slider', 'value'),
      Input('views-slider', 'value'),
-     Input('likes-slider', 'value')],
+     Input('likes-slider', 'value'),
+     Input('filter-mode', 'value'),
+     Input('relations-data', 'data')],
     [State('x-axis-selector', 'value'),
      State('y-axis-selector', 'value'),
      State('color-selector', 'value'),
+     State('scale-selector', 'value'),
      State('claim-filter', 'value'),
      State('verified-filter', 'value'),
      State('ban-filter', 'value')]
 )
-def update_plot(n_clicks, duration_range, views_range, likes_range, 
-                x_axis, y_axis, color_by, claim_status, verified_status, ban_status):
+
+@callback(
+    Output('relations-data', 'data'),
+    Input('filter-mode', 'value'),
+    State('relations-data', 'data')
+)
+@instrumented
+def load_client_data(mode, data):
+    # sent once per visit; later filtering needs no server
+    if mode != 'client' or data is not None:
+        return dash.no_update
+    return client_dataset()
+
+@callback(
+    [Output('point-plot', 'figure', allow_duplicate=True),
+     Output('data-summary', 'children', allow_duplicate=True)],
+    [Input('relations-query', 'data')],
+    [State('duration-slider', 'value'),
+     State('views-slider', 'value'),
+     State('likes-slider', 'value'),
+     State('x-axis-selector', 'value'),
+     State('y-axis-selector', 'value'),
+     State('color-selector', 'value'),
+     State('scale-selector', 'value'),
+     State('claim-filter', 'value'),
+     State('verified-filter', 'value'),
+     State('ban-filter', 'value')],
+    prevent_initial_call=True
+)
+@instrumented
+def update_plot(query, duration_range, views_range, likes_range, 
+                x_axis, y_axis, color_by, scale, claim_status, verified_status, ban_status):
+    plot_requests.submit(query)
     try:
-        filtered_df = data.copy()
-        
-        if claim_status and len(claim_status) > 0:
-            filtered_df = filtered_df[filtered_df['claim_status'].isin(claim_status)]
-        if verified_status and len(verified_status) > 0:
-            filtered_df = filtered_df[filtered_df['verified_status'].isin(verified_status)]
-        if ban_status and len(ban_status) > 0:
-            filtered_df = filtered_df[filtered_df['author_ban_status'].isin(ban_status)]
-        
-        filtered_df = filtered_df[
-            (filtered_df['video_duration_sec'] >= duration_range[0]) & 
-            (filtered_df['video_duration_sec'] <= duration_range[1]) &
-            (filtered_df['video_view_count'] >= views_range[0]) & 
-            (filtered_df['video_view_count'] <= views_range[1]) &
-            (filtered_df['video_like_count'] >= likes_range[0]) & 
-            (filtered_df['video_like_count'] <= likes_range[1])
-        ]
-        
-        if x_axis not in filtered_df.columns or y_axis not in filtered_df.columns:
-            raise ValueError("Selected axis columns not found in data")
+        with stage('filter'):
+            rows = filter_rows(
+                {
+                    'claim_status': claim_status,
+                    'verified_status': verified_status,
+                    'author_ban_status': ban_status
+                },
+                {
+                    'video_duration_sec': duration_range,
+                    'video_view_count': views_range,
+                    'video_like_count': likes_range
+                }
+            )
+            filtered_df = load_dataset().iloc[rows]
             
-        filtered_df = filtered_df.dropna(subset=[x_axis, y_axis])
+            if x_axis not in filtered_df.columns or y_axis not in filtered_df.columns:
+                raise ValueError("Selected axis columns not found in data")
+                
+            filtered_df = filtered_df.dropna(subset=[x_axis, y_axis])
+        plot_requests.check(query, 'filter')
         
         if filtered_df.empty:
             empty_fig = go.Figure()
@@ -260,89 +366,28 @@ def update_plot(n_clicks, duration_range, views_range, likes_range,
             )
             return empty_fig, "No data available for the selected filters"
         
-        if color_by != 'none':
-            fig = px.scatter(
-                filtered_df, 
-                x=x_axis, 
-                y=y_axis, 
-                color=color_by,
-                hover_data={
-                    'video_transcription_text': True,
-                    x_axis: False,
-                    y_axis: False,
-                    color_by: False
-                }
-            )
-            
-            color_title_map = {
-                'claim_status': 'Content Classification',
-                'verified_status': 'Verification Status',
-                'author_ban_status': 'Ban Status'
-            }
-            fig.update_layout(legend_title_text=color_title_map.get(color_by, ''))
-        else:
-            fig = px.scatter(
-                filtered_df, 
-                x=x_axis, 
-                y=y_axis,
-                hover_data={
-                    'video_transcription_text': True,
-                    x_axis: False,
-                    y_axis: False
-                }
-            )
-            fig.update_traces(marker=dict(color=tiktok_pink))
-
-        fig.update_traces(
-            hovertemplate=(
-                '<span style="font-family: Arial; font-size: 12px; color: white; '
-                'background-color: #111111; padding: 5px; border: 1px solid #FF0050; '
-                'border-radius: 3px; max-width: 300px; white-space: pre-wrap; '
-                'display: inline-block;">%{customdata[0]}</span><extra></extra>'
-            ),
-            customdata=filtered_df[['video_transcription_text']].values
-        )
-
-        fig.update_layout(
-            hoverlabel=dict(
-                bgcolor=tiktok_black,
-                font_size=12,
-                font_family="Arial",
-                align="left"
-            )
-        )
+        with stage('figure'):
+            fig = compact_figure(correlation_figure(filtered_df, x_axis, y_axis, color_by, log_scale=scale == 'log'))
         
-        x_title = x_axis.replace('_', ' ').title()
-        y_title = y_axis.replace('_', ' ').title()
-        
-        fig.update_layout(
-            plot_bgcolor=tiktok_black,
-            paper_bgcolor=tiktok_black,
-            font=dict(color=tiktok_white),
-            xaxis_title=x_title,
-            yaxis_title=y_title,
-            hoverlabel=dict(
-                bgcolor=tiktok_black,
-                font_size=14,
-                font_family="Arial"
-            )
-        )
-        
-        try:
-            corr = filtered_df[x_axis].corr(filtered_df[y_axis])*100
-            corr_text = f"Correlation: {corr:.3f}%"
-        except:
-            corr_text = "Correlation: Could not calculate"
-        
-        summary = [
-            html.P(f"Total points: {len(filtered_df)}"),
-            html.P(f"X-Axis: {filtered_df[x_axis].min():.2f} to {filtered_df[x_axis].max():.2f}"),
-            html.P(f"Y-Axis: {filtered_df[y_axis].min():.2f} to {filtered_df[y_axis].max():.2f}"),
-            html.P(corr_text)
-        ]
+        with stage('aggregate'):
+            try:
+                corr = filtered_df[x_axis].corr(filtered_df[y_axis])*100
+                corr_text = f"Correlation: {corr:.3f}%"
+            except:
+                corr_text = "Correlation: Could not calculate"
+            
+            summary = [
+                html.P(f"Total points: {len(filtered_df)}"),
+                html.P(f"X-Axis: {filtered_df[x_axis].min():.2f} to {filtered_df[x_axis].max():.2f}"),
+                html.P(f"Y-Axis: {filtered_df[y_axis].min():.2f} to {filtered_df[y_axis].max():.2f}"),
+                html.P(corr_text)
+            ]
+        plot_requests.check(query, 'aggregate')
         
         return fig, summary
         
+    except PreventUpdate:
+        raise
     except Exception as e:
         error_fig = go.Figure()
         error_fig.update_layout(
@@ -351,4 +396,58 @@ def update_plot(n_clicks, duration_range, views_range, likes_range,
             paper_bgcolor=tiktok_black,
             font=dict(color=tiktok_white)
         )
-        return error_fig, f"Error occurred: {str(e)}"
\ No newline at end of file
+        return error_fig, f"Error occurred: {str(e)}"
+
+@callback(
+    Output('correlation-matrix', 'figure'),
+    [Input('claim-filter', 'value'),
+     Input('verified-filter', 'value'),
+     Input('ban-filter', 'value'),
+     Input('scale-selector', 'value')]
+)
+@instrumented
+def update_correlation_matrix(claim_status, verified_status, ban_status, scale):
+    # summed from per-segment moments; no rows are read
+    with stage('aggregate'):
+        moments = segment_moments()
+        matrix = moments.correlation(
+            {
+                'claim_status': claim_status,
+                'verified_status': verified_status,
+                'author_ban_status': ban_status
+            },
+            space='log' if scale == 'log' else 'linear'
+        )
+    with stage('figure'):
+        fig = correlation_matrix_figure(matrix, moments.columns, space=scale)
+    return fig
+
+@callback(
+    Output('point-details', 'children'),
+    Input('point-plot', 'hoverData'),
+    prevent_initial_call=True
+)
+def show_point_details(hover_data):
+    points = (hover_data or {}).get('points') or []
+    if not points or 'customdata' not in points[0]:
+        return dash.no_update
+    
+    # server-drawn points carry [video_id], browser-drawn ones the bare id
+    customdata = points[0]['customdata']
+    video_id = customdata[0] if isinstance(customdata, list) else customdata
+    record = record_index().record(int(video_id))
+    if record is None:
+        return "Video not found"
+    
+    return [
+        html.P(record['video_transcription_text'] or "No transcript available"),
+        html.P(
+            f"{record['claim_status'].title()} · {record['verified_status'].title()} · "
+            f"{record['author_ban_status'].title()} · {record['video_duration_sec']}s"
+        ),
+        html.P(
+            f"{record['video_view_count']:,} views · {record['video_like_count']:,} likes · "
+            f"{record['video_share_count']:,} shares · {record['video_download_count']:,} downloads · "
+            f"{record['video_comment_count']:,} comments"
+        )
+    ]
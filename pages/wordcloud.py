@@ -1,19 +1,34 @@
+import time
+
 from dash import dcc, html, Input, Output, callback, State
 import dash_bootstrap_components as dbc
-from wordcloud import WordCloud
-import matplotlib
-matplotlib.use('Agg')
-import matplotlib.pyplot as plt
-import io
-import base64
-import pandas as pd
 import dash
 
-df = pd.read_csv('data/tiktok_dataset.csv')
+from src.data import column_summary, dataset_fingerprint, load_manifest
+from src.indexes import bitmap_index, filter_key, filter_rows, range_index
+from src.jobs import report_job
+from src.lru import cache_key
+from src.metrics import collect_stages, instrumented, stage
+from src.startup import cached_layout
+from src.wordcloud_images import image_path, render_wordcloud, warm_renderer, wordcloud_cache
+
 dash.register_page(__name__, path='/wordcloud', name="Content Themes")
 
-def clean_dropdown_options(series):
-    return [{'label': str(s), 'value': s} for s in series.unique() if pd.notna(s)]
+def column_bounds(col):
+    # slider bounds come from the ingest summaries, not a column scan
+    summary = column_summary(col)
+    return int(summary['min']), int(summary['max'])
+
+def clean_dropdown_options(col):
+    # categories in order of first appearance, as stored at ingest
+    return [{'label': str(s), 'value': s} for s in load_manifest()['categories'][col]]
+
+# progress bar value and label as each stage of a render starts
+render_progress = {
+    'filter': (10, "Filtering videos"),
+    'aggregate': (30, "Counting words"),
+    'render': (60, "Drawing the cloud")
+}
 
 # color palette for py compatibility
 tiktok_pink = '#FF0050'
@@ -22,183 +37,194 @@ tiktok_black = '#000000'
 tiktok_dark = '#111111'
 tiktok_white = '#FFFFFF'
 
-# colormap generator for the wordcloud
-def make_tiktok_colormap():
-    from matplotlib.colors import LinearSegmentedColormap
-    colors = [tiktok_pink, tiktok_aqua, '#FFFFFF']
-    return LinearSegmentedColormap.from_list('tiktok', colors)
-
-layout = html.Div([
-    html.H1("What are the common themes in these videos?", className="text-center"),
+@cached_layout
+def layout():
+    return html.Div([
+        html.H1("What are the common themes in these videos?", className="text-center"),
+    
+        # dummy output
+        html.Div(id='dummy-output', style={'display': 'none'}),
+        html.Div(id='dummy-input', style={'display': 'none'}),
     
-    # dummy output
-    html.Div(id='dummy-output', style={'display': 'none'}),
-    html.Div(id='dummy-input', style={'display': 'none'}),
+        # word clouds that are not cached yet are drawn by a background job
+        dcc.Store(id='wordcloud-job'),
     
-    # collapisble filters
-    dbc.Collapse(
-        html.Div([
-            # discrete value filters
-            dbc.Row([
-                dbc.Col([
-                    html.Label("Claim Status:"),
-                    dcc.Dropdown(
-                        id='claim-filter',
-                        options=clean_dropdown_options(df['claim_status']),
-                        value=[],
-                        multi=True,
-                        className='multi-dropdown mb-4'
-                    ),
-                ], width={"size": 3, "offset": 0}),
+        # collapisble filters
+        dbc.Collapse(
+            html.Div([
+                # discrete value filters
+                dbc.Row([
+                    dbc.Col([
+                        html.Label("Claim Status:"),
+                        dcc.Dropdown(
+                            id='claim-filter',
+                            options=clean_dropdown_options('claim_status'),
+                            value=[],
+                            multi=True,
+                            className='multi-dropdown mb-4'
+                        ),
+                    ], width={"size": 3, "offset": 0}),
                 
-                dbc.Col([
-                    html.Label("Verified Status:"),
-                    dcc.Dropdown(
-                        id='verified-filter',
-                        options=clean_dropdown_options(df['verified_status']),
-                        value=[],
-                        multi=True,
-                        className='multi-dropdown mb-4'
-                    ),
-                ], width={"size": 3, "offset": 0}),
+                    dbc.Col([
+                        html.Label("Verified Status:"),
+                        dcc.Dropdown(
+                            id='verified-filter',
+                            options=clean_dropdown_options('verified_status'),
+                            value=[],
+                            multi=True,
+                            className='multi-dropdown mb-4'
+                        ),
+                    ], width={"size": 3, "offset": 0}),
                 
-                dbc.Col([
-                    html.Label("Ban Status:"),
-                    dcc.Dropdown(
-                        id='ban-filter',
-                        options=clean_dropdown_options(df['author_ban_status']),
-                        value=[],
-                        multi=True,
-                        className='multi-dropdown mb-4'
-                    ),
-                ], width={"size": 3, "offset": 0}),
-            ], justify="center", className="mb-4"),
+                    dbc.Col([
+                        html.Label("Ban Status:"),
+                        dcc.Dropdown(
+                            id='ban-filter',
+                            options=clean_dropdown_options('author_ban_status'),
+                            value=[],
+                            multi=True,
+                            className='multi-dropdown mb-4'
+                        ),
+                    ], width={"size": 3, "offset": 0}),
+                ], justify="center", className="mb-4"),
             
-            # numerical/continuous filters
-            dbc.Row([
-                dbc.Col([
-                    html.Label("Video Duration (seconds):"),
-                    dcc.RangeSlider(
-                        id='duration-slider',
-                        min=df['video_duration_sec'].min(),
-                        max=df['video_duration_sec'].max(),
-                        step=1,
-                        value=[df['video_duration_sec'].min(), df['video_duration_sec'].max()],
-                        marks=None,
-                        tooltip={"placement": "bottom", "always_visible": True},
-                        className='tiktok-slider'
-                    ),
-                ], width={"size": 3, "offset": 0}),
+                # numerical/continuous filters
+                dbc.Row([
+                    dbc.Col([
+                        html.Label("Video Duration (seconds):"),
+                        dcc.RangeSlider(
+                            id='duration-slider',
+                            min=column_bounds('video_duration_sec')[0],
+                            max=column_bounds('video_duration_sec')[1],
+                            step=1,
+                            value=list(column_bounds('video_duration_sec')),
+                            marks=None,
+                            tooltip={"placement": "bottom", "always_visible": True},
+                            className='tiktok-slider'
+                        ),
+                    ], width={"size": 3, "offset": 0}),
                 
-                dbc.Col([
-                    html.Label("Video Views:"),
-                    dcc.RangeSlider(
-                        id='views-slider',
-                        min=df['video_view_count'].min(),
-                        max=df['video_view_count'].max(),
-                        step=1000,
-                        value=[df['video_view_count'].min(), df['video_view_count'].max()],
-                        marks=None,
-                        tooltip={"placement": "bottom", "always_visible": True},
-                        className='tiktok-slider'
-                    ),
-                ], width={"size": 3, "offset": 0}),
+                    dbc.Col([
+                        html.Label("Video Views:"),
+                        dcc.RangeSlider(
+                            id='views-slider',
+                            min=column_bounds('video_view_count')[0],
+                            max=column_bounds('video_view_count')[1],
+                            step=1000,
+                            value=list(column_bounds('video_view_count')),
+                            marks=None,
+                            tooltip={"placement": "bottom", "always_visible": True},
+                            className='tiktok-slider'
+                        ),
+                    ], width={"size": 3, "offset": 0}),
                 
-                dbc.Col([
-                    html.Label("Video Likes:"),
-                    dcc.RangeSlider(
-                        id='likes-slider',
-                        min=df['video_like_count'].min(),
-                        max=df['video_like_count'].max(),
-                        step=1000,
-                        value=[df['video_like_count'].min(), df['video_like_count'].max()],
-                        marks=None,
-                        tooltip={"placement": "bottom", "always_visible": True},
-                        className='tiktok-slider'
-                    ),
-                ], width={"size": 3, "offset": 0}),
-            ], justify="center", className="mb-4"),
+                    dbc.Col([
+                        html.Label("Video Likes:"),
+                        dcc.RangeSlider(
+                            id='likes-slider',
+                            min=column_bounds('video_like_count')[0],
+                            max=column_bounds('video_like_count')[1],
+                            step=1000,
+                            value=list(column_bounds('video_like_count')),
+                            marks=None,
+                            tooltip={"placement": "bottom", "always_visible": True},
+                            className='tiktok-slider'
+                        ),
+                    ], width={"size": 3, "offset": 0}),
+                ], justify="center", className="mb-4"),
             
-            dbc.Row([
-                dbc.Col([
-                    html.Label("Video Shares:"),
-                    dcc.RangeSlider(
-                        id='shares-slider',
-                        min=df['video_share_count'].min(),
-                        max=df['video_share_count'].max(),
-                        step=100,
-                        value=[df['video_share_count'].min(), df['video_share_count'].max()],
-                        marks=None,
-                        tooltip={"placement": "bottom", "always_visible": True},
-                        className='tiktok-slider'
-                    ),
-                ], width={"size": 3, "offset": 0}),
+                dbc.Row([
+                    dbc.Col([
+                        html.Label("Video Shares:"),
+                        dcc.RangeSlider(
+                            id='shares-slider',
+                            min=column_bounds('video_share_count')[0],
+                            max=column_bounds('video_share_count')[1],
+                            step=100,
+                            value=list(column_bounds('video_share_count')),
+                            marks=None,
+                            tooltip={"placement": "bottom", "always_visible": True},
+                            className='tiktok-slider'
+                        ),
+                    ], width={"size": 3, "offset": 0}),
                 
-                dbc.Col([
-                    html.Label("Video Downloads:"),
-                    dcc.RangeSlider(
-                        id='downloads-slider',
-                        min=df['video_download_count'].min(),
-                        max=df['video_download_count'].max(),
-                        step=100,
-                        value=[df['video_download_count'].min(), df['video_download_count'].max()],
-                        marks=None,
-                        tooltip={"placement": "bottom", "always_visible": True},
-                        className='tiktok-slider'
-                    ),
-                ], width={"size": 3, "offset": 0}),
+                    dbc.Col([
+                        html.Label("Video Downloads:"),
+                        dcc.RangeSlider(
+                            id='downloads-slider',
+                            min=column_bounds('video_download_count')[0],
+                            max=column_bounds('video_download_count')[1],
+                            step=100,
+                            value=list(column_bounds('video_download_count')),
+                            marks=None,
+                            tooltip={"placement": "bottom", "always_visible": True},
+                            className='tiktok-slider'
+                        ),
+                    ], width={"size": 3, "offset": 0}),
                 
-                dbc.Col([
-                    html.Label("Video Comments:"),
-                    dcc.RangeSlider(
-                        id='comments-slider',
-                        min=df['video_comment_count'].min(),
-                        max=df['video_comment_count'].max(),
-                        step=100,
-                        value=[df['video_comment_count'].min(), df['video_comment_count'].max()],
-                        marks=None,
-                        tooltip={"placement": "bottom", "always_visible": True},
-                        className='tiktok-slider'
-                    ),
-                ], width={"size": 3, "offset": 0}),
-            ], justify="center", className="mb-4"),
+                    dbc.Col([
+                        html.Label("Video Comments:"),
+                        dcc.RangeSlider(
+                            id='comments-slider',
+                            min=column_bounds('video_comment_count')[0],
+                            max=column_bounds('video_comment_count')[1],
+                            step=100,
+                            value=list(column_bounds('video_comment_count')),
+                            marks=None,
+                            tooltip={"placement": "bottom", "always_visible": True},
+                            className='tiktok-slider'
+                        ),
+                    ], width={"size": 3, "offset": 0}),
+                ], justify="center", className="mb-4"),
+            
+                dbc.Row([
+                    dbc.Col([
+                        html.Button('Generate Word Cloud', id='generate-btn', 
+                                className='dash-button glitch-button generate-button'),
+                        html.Button('Cancel', id='cancel-btn', 
+                                className='dash-button generate-button',
+                                style={'display': 'none'})
+                    ], width={"size": 6, "offset": 3})
+                ], justify="center", className="mb-4"),
             
-            dbc.Row([
-                dbc.Col([
-                    html.Button('Generate Word Cloud', id='generate-btn', 
-                            className='dash-button glitch-button generate-button')
-                ], width={"size": 6, "offset": 3})
-            ], justify="center", className="mb-4"),
+                dbc.Row([
+                    dbc.Col([
+                        dbc.Progress(id='wordcloud-progress', value=0, striped=True, animated=True,
+                                     color='danger', style={'display': 'none'})
+                    ], width={"size": 6, "offset": 3})
+                ], justify="center", className="mb-4"),
             
-        ], className="filter-container"),
-        id="collapse-filters",
-        is_open=True,
-        className="collapsible"
-    ),
+            ], className="filter-container"),
+            id="collapse-filters",
+            is_open=True,
+            className="collapsible"
+        ),
     
-    dbc.Row([
-        dbc.Col([
-            html.Button(
-                html.I(className="fas fa-chevron-up"),
-                id="collapse-button",
-                className="dash-button arrow-button"
-            ),
-        ], width={"size": 2, "offset": 5})
-    ], justify="center", className="mb-4"),
+        dbc.Row([
+            dbc.Col([
+                html.Button(
+                    html.I(className="fas fa-chevron-up"),
+                    id="collapse-button",
+                    className="dash-button arrow-button"
+                ),
+            ], width={"size": 2, "offset": 5})
+        ], justify="center", className="mb-4"),
     
-    dbc.Row([
-        dbc.Col([
-            html.Div(id='wordcloud-container', className="wordcloud-container")
-        ], width={"size": 10, "offset": 1})
-    ], justify="center")
-], className="main-container")
+        dbc.Row([
+            dbc.Col([
+                html.Div(id='wordcloud-container', className="wordcloud-container")
+            ], width={"size": 10, "offset": 1})
+        ], justify="center")
+    ], className="main-container")
+
+    # toggle filters callback
 
-# toggle filters callback
 @callback(
     Output("collapse-filters", "is_open"),
     [Input("collapse-button", "n_clicks")],
     [State("collapse-filters", "is_open")]
 )
+@instrumented
 def toggle_filters(n, is_open):
     if n:
         return not is_open
@@ -215,9 +241,20 @@ def update_button_icon(is_open):
     else:
         return html.I(className="fas fa-chevron-down")
 
-# callback to generate word cloud
+def wordcloud_image(key, image):
+    if not image:
+        return html.Div("No transcripts match these filters", className="default-text")
+    
+    # the image itself is served (and browser-cached) by the wordcloud route
+    return html.Img(
+        src=dash.get_relative_path(image_path(key)), 
+        className="wordcloud-image"
+    )
+
+# callback to generate word cloud; cached clouds are returned straight away
 @callback(
-    Output('wordcloud-container', 'children'),
+    [Output('wordcloud-container', 'children'),
+     Output('wordcloud-job', 'data')],
     [Input('generate-btn', 'n_clicks')],
     [State('claim-filter', 'value'),
      State('verified-filter', 'value'),
@@ -229,86 +266,69 @@ def update_button_icon(is_open):
      State('downloads-slider', 'value'),
      State('comments-slider', 'value')]
 )
+@instrumented
 def update_wordcloud(n_clicks, claim_status, verified_status, ban_status, 
                      duration_range, views_range, likes_range, 
                      shares_range, downloads_range, comments_range):
     if n_clicks is None:
         return html.Div("Adjust filters and click 'Generate Word Cloud'", 
-                       className="default-text")
+                       className="default-text"), dash.no_update
     
-    # filter dataframe
-    filtered_df = df.copy()
+    selections = {
+        'claim_status': claim_status,
+        'verified_status': verified_status,
+        'author_ban_status': ban_status
+    }
+    ranges = {
+        'video_duration_sec': duration_range,
+        'video_view_count': views_range,
+        'video_like_count': likes_range,
+        'video_share_count': shares_range,
+        'video_download_count': downloads_range,
+        'video_comment_count': comments_range
+    }
     
-    if claim_status and len(claim_status) > 0:
-        filtered_df = filtered_df[filtered_df['claim_status'].isin(claim_status)]
-    if verified_status and len(verified_status) > 0:
-        filtered_df = filtered_df[filtered_df['verified_status'].isin(verified_status)]
-    if ban_status and len(ban_status) > 0:
-        filtered_df = filtered_df[filtered_df['author_ban_status'].isin(ban_status)]
+    # equivalent filter states share one cached render
+    key = cache_key(dataset_fingerprint(), filter_key(selections, ranges))
+    image = wordcloud_cache.get(key)
+    if image is not None:
+        return wordcloud_image(key, image), dash.no_update
     
-    if duration_range:
-        filtered_df = filtered_df[
-            (filtered_df['video_duration_sec'] >= duration_range[0]) & 
-            (filtered_df['video_duration_sec'] <= duration_range[1])]
-    if views_range:
-        filtered_df = filtered_df[
-            (filtered_df['video_view_count'] >= views_range[0]) & 
-            (filtered_df['video_view_count'] <= views_range[1])]
-    if likes_range:
-        filtered_df = filtered_df[
-            (filtered_df['video_like_count'] >= likes_range[0]) & 
-            (filtered_df['video_like_count'] <= likes_range[1])]
-    if shares_range:
-        filtered_df = filtered_df[
-            (filtered_df['video_share_count'] >= shares_range[0]) & 
-            (filtered_df['video_share_count'] <= shares_range[1])]
-    if downloads_range:
-        filtered_df = filtered_df[
-            (filtered_df['video_download_count'] >= downloads_range[0]) & 
-            (filtered_df['video_download_count'] <= downloads_range[1])]
-    if comments_range:
-        filtered_df = filtered_df[
-            (filtered_df['video_comment_count'] >= comments_range[0]) & 
-            (filtered_df['video_comment_count'] <= comments_range[1])]
-    
-    text = ' '.join(filtered_df['video_transcription_text'].dropna())
-    
-    if not text:
-        return html.Div("No transcripts match these filters", className="default-text")
-    
-    try:
-        wordcloud = WordCloud(
-            width=1200,
-            height=600,
-            background_color=tiktok_black,
-            colormap=make_tiktok_colormap(),
-            max_words=100,
-            prefer_horizontal=0.9,
-            relative_scaling=0.5
-        ).generate(text)
-    except:
-        # if colormap fails, fallback to default colormap
-        wordcloud = WordCloud(
-            width=1200,
-            height=600,
-            background_color=tiktok_black,
-            colormap='viridis',
-            max_words=100
-        ).generate(text)
-    
-    plt.figure(figsize=(15, 8))
-    plt.imshow(wordcloud, interpolation='bilinear')
-    plt.axis("off")
-    
-    # buffer
-    buf = io.BytesIO()
-    plt.savefig(buf, format='png', bbox_inches='tight', pad_inches=0, facecolor=tiktok_black)
-    plt.close()
-    buf.seek(0)
-    
-    img_str = base64.b64encode(buf.read()).decode('utf-8')
+    # the job's process is forked from this one and inherits what is loaded here
+    bitmap_index()
+    range_index()
+    warm_renderer()
+    return dash.no_update, {'selections': selections, 'ranges': ranges}
+
+# renders run in a job process; a new job replaces a running one
+@callback(
+    Output('wordcloud-container', 'children', allow_duplicate=True),
+    Input('wordcloud-job', 'data'),
+    background=True,
+    progress=[Output('wordcloud-progress', 'value'),
+              Output('wordcloud-progress', 'label')],
+    progress_default=[0, ''],
+    running=[
+        (Output('generate-btn', 'disabled'), True, False),
+        (Output('cancel-btn', 'style'), {}, {'display': 'none'}),
+        (Output('wordcloud-progress', 'style'), {}, {'display': 'none'})
+    ],
+    cancel=[Input('cancel-btn', 'n_clicks')],
+    prevent_initial_call=True
+)
+def generate_wordcloud(set_progress, job):
+    start = time.perf_counter()
+    selections, ranges = job['selections'], job['ranges']
+    # the key is derived here, never taken from the store, and from the snapshot the job reads
+    key = cache_key(dataset_fingerprint(), filter_key(selections, ranges))
+    with collect_stages(lambda name: set_progress(render_progress[name])) as stages:
+        def render():
+            with stage('filter'):
+                rows = filter_rows(selections, ranges)
+            return render_wordcloud(rows)
+        
+        # another worker may have drawn the same cloud in the meantime
+        image = wordcloud_cache.get_or_create(key, render)
     
-    return html.Img(
-        src=f'data:imsage/png;base64,{img_str}', 
-        className="wordcloud-image"
-    )
\ No newline at end of file
+    report_job('generate_wordcloud', time.perf_counter() - start, stages)
+    return wordcloud_image(key, image)
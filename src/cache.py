@@ -0,0 +1,233 @@
+"""On-disk snapshot store for the cleaned dataset and its aggregates.
+
+Each source file gets a directory under `data/.cache/<stem>/` holding one
+immutable snapshot directory per build plus a `CURRENT` pointer:
+
+    CURRENT                   JSON: snapshot id and source fingerprint
+    <snapshot>/manifest.json  rows, categories, part lists, lineage
+    <snapshot>/rows-*.arrow   uncompressed Arrow IPC, categoricals as codes
+    <snapshot>/aggregates.npz crosstabs, duration histograms, moments, summaries
+    <snapshot>/tokens-*.npz   document-term count parts
+    <snapshot>/vocabulary.json
+
+Snapshots are written under a temporary name and published by renaming the
+directory and then atomically replacing `CURRENT`, so readers never see a
+partial build. Row parts are memory-mapped on load instead of parsed. An
+appended snapshot hard-links its parent's parts and adds new ones, so
+publishing it copies nothing.
+"""
+import hashlib
+import json
+import os
+import shutil
+import uuid
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+# bump whenever the snapshot layout or the cleaned schema changes
+CACHE_VERSION = 5
+
+CACHE_DIR = Path(__file__).resolve().parent.parent / 'data' / '.cache'
+
+# snapshots kept besides the current one, for readers still mapping them
+KEEP_SNAPSHOTS = 1
+
+
+class HashingReader:
+    """File wrapper that hashes bytes as they are read, so a streamed parse
+    fingerprints the source without a second pass over it."""
+
+    def __init__(self, path):
+        self._file = open(path, 'rb')
+        self._digest = hashlib.blake2b(digest_size=16)
+
+    def read(self, size=-1):
+        chunk = self._file.read(size)
+        self._digest.update(chunk)
+        return chunk
+
+    def hexdigest(self):
+        # hash whatever the parser did not consume
+        while chunk := self._file.read(1 << 20):
+            self._digest.update(chunk)
+        return self._digest.hexdigest()
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def file_hash(path, chunk_size=1 << 20):
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        while chunk := f.read(chunk_size):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def source_stat(source):
+    st = os.stat(source)
+    return {'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+
+
+def store_dir(source, cache_dir=CACHE_DIR):
+    return Path(cache_dir) / Path(source).stem
+
+
+def atomic_write_text(path, text):
+    tmp = path.with_name(f'{path.name}.{os.getpid()}.{uuid.uuid4().hex[:8]}.tmp')
+    try:
+        tmp.write_text(text)
+        os.replace(tmp, path)
+    finally:
+        tmp.unlink(missing_ok=True)
+
+
+def read_current(source, cache_dir=CACHE_DIR):
+    try:
+        return json.loads((store_dir(source, cache_dir) / 'CURRENT').read_text())
+    except FileNotFoundError:
+        return None
+
+
+def is_fresh(source, cache_dir=CACHE_DIR, verify=False):
+    """Whether the current snapshot still matches `source`.
+
+    Size and mtime are compared first; the content hash is only computed when
+    they differ (or `verify` is set), so a touched but unchanged file keeps
+    its snapshot.
+    """
+    current = read_current(source, cache_dir)
+    if current is None or current.get('version') != CACHE_VERSION:
+        return False
+    if not (store_dir(source, cache_dir) / current['snapshot']).is_dir():
+        return False
+
+    stat = source_stat(source)
+    if not verify and stat == {k: current.get(k) for k in stat}:
+        return True
+    if file_hash(source) != current.get('hash'):
+        return False
+
+    # content unchanged; refresh the stat fields so the next check is cheap
+    current.update(stat)
+    atomic_write_text(store_dir(source, cache_dir) / 'CURRENT', json.dumps(current))
+    return True
+
+
+def current_snapshot(source, cache_dir=CACHE_DIR):
+    """Directory of the current snapshot for `source`, or None."""
+    current = read_current(source, cache_dir)
+    if current is None:
+        return None
+    return store_dir(source, cache_dir) / current['snapshot']
+
+
+def new_snapshot_dir(source, cache_dir=CACHE_DIR):
+    path = store_dir(source, cache_dir) / f'.building-{os.getpid()}-{uuid.uuid4().hex[:8]}'
+    path.mkdir(parents=True)
+    return path
+
+
+def link_or_copy(src, dst):
+    """Hard-link `src` to `dst`, copying when the filesystem cannot link."""
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+
+def publish_snapshot(source, build_dir, snapshot_id, current, cache_dir=CACHE_DIR):
+    """Move a finished build into place and point `CURRENT` at it."""
+    root = store_dir(source, cache_dir)
+    final = root / snapshot_id
+    if final.exists() and read_manifest(final).get('version') == CACHE_VERSION:
+        # identical content was already published; keep the existing copy
+        shutil.rmtree(build_dir)
+    else:
+        if final.exists():
+            # same content in an older layout; move it aside before replacing it
+            stale = root / f'.stale-{os.getpid()}-{uuid.uuid4().hex[:8]}'
+            try:
+                os.replace(final, stale)
+            except FileNotFoundError:
+                pass  # another process moved it first
+            else:
+                shutil.rmtree(stale, ignore_errors=True)
+        try:
+            os.replace(build_dir, final)
+        except OSError:
+            if not final.is_dir():
+                raise
+            # another worker published the same content in the meantime
+            shutil.rmtree(build_dir)
+    atomic_write_text(root / 'CURRENT', json.dumps({
+        **current, 'version': CACHE_VERSION, 'snapshot': snapshot_id
+    }))
+    prune_snapshots(source, cache_dir)
+    return final
+
+
+def prune_snapshots(source, cache_dir=CACHE_DIR, keep=KEEP_SNAPSHOTS):
+    root = store_dir(source, cache_dir)
+    current = read_current(source, cache_dir)
+    snapshots = sorted(
+        (p for p in root.iterdir() if p.is_dir() and not p.name.startswith('.')),
+        key=lambda p: p.stat().st_mtime, reverse=True
+    )
+    old = [p for p in snapshots if current is None or p.name != current['snapshot']]
+    for path in old[keep:]:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def read_manifest(snapshot):
+    return json.loads((Path(snapshot) / 'manifest.json').read_text())
+
+
+def _row_tables(snapshot, manifest, columns=None):
+    for part in manifest['row_parts']:
+        with pa.memory_map(str(snapshot / part), 'r') as source_map:
+            table = pa.ipc.open_file(source_map).read_all()
+        yield table if columns is None else table.select(columns)
+
+
+def read_schema(snapshot, manifest=None):
+    """Arrow schema of the snapshot's row parts."""
+    snapshot = Path(snapshot)
+    manifest = read_manifest(snapshot) if manifest is None else manifest
+    with pa.memory_map(str(snapshot / manifest['row_parts'][0]), 'r') as source_map:
+        return pa.ipc.open_file(source_map).schema
+
+
+def read_column(snapshot, col, manifest=None):
+    """One column of the snapshot's rows as a NumPy array."""
+    snapshot = Path(snapshot)
+    manifest = read_manifest(snapshot) if manifest is None else manifest
+    chunks = [table.column(col).to_numpy() for table in _row_tables(snapshot, manifest, [col])]
+    return np.concatenate(chunks) if chunks else np.array([])
+
+
+def read_rows(snapshot, manifest=None):
+    """The snapshot's rows as one DataFrame, with row parts memory-mapped."""
+    snapshot = Path(snapshot)
+    manifest = read_manifest(snapshot) if manifest is None else manifest
+    tables = list(_row_tables(snapshot, manifest))
+    table = pa.concat_tables(tables) if len(tables) > 1 else tables[0]
+    # split_blocks lets numeric columns stay zero-copy views of the mapping
+    df = table.to_pandas(split_blocks=True)
+    for col, categories in manifest['categories'].items():
+        df[col] = pd.Categorical.from_codes(df[col].to_numpy(), categories=categories)
+    return df[manifest['columns']]
+
+
+def read_aggregates(snapshot):
+    with np.load(Path(snapshot) / 'aggregates.npz') as arrays:
+        return {name: arrays[name] for name in arrays.files}
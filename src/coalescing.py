@@ -0,0 +1,61 @@
+"""Drop callback requests that a newer request from the same page replaced.
+
+A slider drag fires a burst of requests for the same output, and the page
+only displays the last response. The page tags each request with a `session`
+id, drawn once per page load, and an increasing `seq`. `submit(query)`
+records the request as its session's latest. `check(query, stage)` is called
+between stages: once a newer request has arrived, the older one raises
+`Superseded`, a `PreventUpdate`, so Dash answers with an empty response and
+the rest of the work and the serialization are skipped.
+
+Requests that are not tagged, like direct calls from benchmarks, always run.
+State is per process, so only requests that reach the same worker coalesce.
+"""
+import threading
+from collections import OrderedDict
+
+from dash.exceptions import PreventUpdate
+
+from src.metrics import observe_skipped
+
+# least recently active sessions are forgotten past this
+MAX_SESSIONS = 10000
+
+
+class Superseded(PreventUpdate):
+    pass
+
+
+class LatestRequests:
+    """The latest request seq of each page session, for one callback."""
+
+    def __init__(self, callback, max_sessions=MAX_SESSIONS):
+        self.callback = callback
+        self.max_sessions = max_sessions
+        self._latest = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, query):
+        """Record `query` and drop it if a newer request already arrived."""
+        if not isinstance(query, dict):
+            return
+        session, seq = query['session'], query['seq']
+        with self._lock:
+            # requests can arrive out of order; keep the highest seq
+            self._latest[session] = max(seq, self._latest.pop(session, seq))
+            if len(self._latest) > self.max_sessions:
+                self._latest.popitem(last=False)
+        self.check(query, 'queued')
+
+    def check(self, query, stage_name):
+        """Raise `Superseded` if a newer request from `query`'s page arrived.
+
+        `stage_name` is the last stage `query` finished, for the skip counter.
+        """
+        if not isinstance(query, dict):
+            return
+        with self._lock:
+            latest = self._latest.get(query['session'], query['seq'])
+        if latest > query['seq']:
+            observe_skipped(self.callback, stage_name)
+            raise Superseded
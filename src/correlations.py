@@ -0,0 +1,186 @@
+"""Correlations figure: one engagement metric against another.
+
+Shared by the Correlations page and the figure export (`python -m src.export`).
+Small selections are drawn as individual points carrying only their
+`video_id`; above `DENSITY_POINT_THRESHOLD` rows the figure becomes a binned
+2D density grid so the payload stays bounded.
+
+`correlation_matrix_figure` draws the full matrix across the count columns,
+computed from per-segment moments (`src.moments`) without reading rows.
+
+`client_dataset` packs the columns the page's in-browser filtering mode
+needs (`assets/relations.js`) as base64 typed arrays, the encoding plotly.js
+itself reads.
+"""
+import base64
+import os
+
+import numpy as np
+import plotly.colors
+import plotly.graph_objects as go
+
+from src.data import DATA_PATH, load_dataset, snapshot_cached
+from src.density import histogram_2d
+from src.schema import CATEGORICAL_COLUMNS, COUNT_COLUMNS, ID_COLUMN
+
+tiktok_pink = '#FF0050'
+tiktok_black = '#000000'
+tiktok_white = '#FFFFFF'
+
+color_title_map = {
+    'claim_status': 'Content Classification',
+    'verified_status': 'Verification Status',
+    'author_ban_status': 'Ban Status'
+}
+
+# above this many filtered rows the scatter switches to a binned density grid
+DENSITY_POINT_THRESHOLD = int(os.environ.get('DENSITY_POINT_THRESHOLD', 50000))
+DENSITY_BINS = 150
+
+# the in-browser filtering mode ships every row, so it is only offered up to this size
+CLIENT_FILTER_MAX_ROWS = int(os.environ.get('CLIENT_FILTER_MAX_ROWS', 100000))
+
+style_layout = dict(
+    plot_bgcolor=tiktok_black,
+    paper_bgcolor=tiktok_black,
+    font=dict(color=tiktok_white),
+    hoverlabel=dict(
+        bgcolor=tiktok_black,
+        font_size=14,
+        font_family="Arial",
+        align="left"
+    )
+)
+
+
+def axis_title(col):
+    return col.replace('_', ' ').title()
+
+
+def density_figure(df, x_axis, y_axis, color_by, log_scale):
+    if color_by != 'none':
+        groups = df[color_by].cat.codes.to_numpy()
+        names = list(df[color_by].cat.categories)
+    else:
+        groups = None
+        names = [None]
+
+    x_edges, y_edges, counts = histogram_2d(
+        df[x_axis].to_numpy(), df[y_axis].to_numpy(), bins=DENSITY_BINS,
+        log_x=log_scale, log_y=log_scale, groups=groups, n_groups=len(names)
+    )
+
+    palette = plotly.colors.qualitative.Plotly
+    fig = go.Figure()
+    for i, name in enumerate(names):
+        color = tiktok_pink if name is None else palette[i % len(palette)]
+        # empty cells stay transparent so overlapping categories show through
+        z = np.where(counts[i] > 0, counts[i], np.nan).astype(np.float32)
+        fig.add_trace(go.Heatmap(
+            x=x_edges,
+            y=y_edges,
+            z=z,
+            name=name or 'Count',
+            showlegend=name is not None,
+            showscale=False,
+            opacity=0.85 if name is None else 0.6,
+            colorscale=[[0, 'rgba(0,0,0,0)'], [0.05, color], [1, tiktok_white]],
+            zmin=0,
+            zmax=np.nanmax(z) if np.isfinite(z).any() else 1,
+            hovertemplate=f"{name or 'Points'}: %{{z}}<extra></extra>"
+        ))
+
+    if log_scale:
+        fig.update_xaxes(type='log')
+        fig.update_yaxes(type='log')
+    if color_by != 'none':
+        fig.update_layout(legend_title_text=color_title_map.get(color_by, ''))
+    return fig
+
+
+def scatter_figure(df, x_axis, y_axis, color_by, log_scale):
+    # plotly.express is slow to import; only load it once a scatter is drawn
+    import plotly.express as px
+
+    # points carry only their video_id; transcripts are looked up on hover
+    if color_by != 'none':
+        fig = px.scatter(df, x=x_axis, y=y_axis, color=color_by, custom_data=['video_id'])
+        fig.update_layout(legend_title_text=color_title_map.get(color_by, ''))
+    else:
+        fig = px.scatter(df, x=x_axis, y=y_axis, custom_data=['video_id'])
+        fig.update_traces(marker=dict(color=tiktok_pink))
+
+    fig.update_traces(
+        hovertemplate=(
+            f'{axis_title(x_axis)}: %{{x:,}}<br>'
+            f'{axis_title(y_axis)}: %{{y:,}}<extra></extra>'
+        )
+    )
+
+    if log_scale:
+        fig.update_xaxes(type='log')
+        fig.update_yaxes(type='log')
+    return fig
+
+
+def correlation_figure(df, x_axis, y_axis, color_by='none', log_scale=False, **layout):
+    """Styled scatter or density figure of `y_axis` against `x_axis`."""
+    if len(df) > DENSITY_POINT_THRESHOLD:
+        # too many points to ship individually; send a binned density grid
+        fig = density_figure(df, x_axis, y_axis, color_by, log_scale)
+    else:
+        fig = scatter_figure(df, x_axis, y_axis, color_by, log_scale)
+
+    fig.update_layout(
+        **style_layout,
+        xaxis_title=axis_title(x_axis),
+        yaxis_title=axis_title(y_axis)
+    )
+    fig.update_layout(**layout)
+    return fig
+
+
+def correlation_matrix_figure(matrix, columns, space='linear', **layout):
+    """Heatmap of a Pearson correlation matrix, as from `src.moments`."""
+    labels = [axis_title(col).replace('Video ', '') for col in columns]
+    fig = go.Figure(go.Heatmap(
+        z=matrix,
+        x=labels,
+        y=labels,
+        zmin=-1,
+        zmax=1,
+        colorscale=[[0, '#00F2EA'], [0.5, tiktok_black], [1, tiktok_pink]],
+        texttemplate='%{z:.2f}',
+        hovertemplate='%{y} vs %{x}: %{z:.3f}<extra></extra>'
+    ))
+    fig.update_layout(
+        **style_layout,
+        title=f"Correlation matrix ({'log1p counts' if space == 'log' else 'counts'})",
+        yaxis_autorange='reversed'
+    )
+    fig.update_layout(**layout)
+    return fig
+
+
+def typed_array(values):
+    """`values` as a plotly.js typed array spec: dtype code and base64 bytes."""
+    values = np.ascontiguousarray(values, dtype=np.asarray(values).dtype.newbyteorder('<'))
+    return {'dtype': values.dtype.str[1:], 'bdata': base64.b64encode(values).decode('ascii')}
+
+
+@snapshot_cached
+def client_dataset(path=DATA_PATH):
+    """Every row's numeric columns, category codes and id, for in-browser filtering."""
+    df = load_dataset(path)
+    return {
+        'rows': len(df),
+        'columns': {col: typed_array(df[col].to_numpy()) for col in COUNT_COLUMNS},
+        # ids stay exact as doubles below 2**53; plotly.js has no 64-bit integers
+        'ids': typed_array(df[ID_COLUMN].to_numpy(np.float64)),
+        'codes': {col: typed_array(df[col].cat.codes.to_numpy()) for col in CATEGORICAL_COLUMNS},
+        'categories': {col: [str(v) for v in df[col].cat.categories] for col in CATEGORICAL_COLUMNS},
+        'color_titles': color_title_map,
+        'palette': plotly.colors.qualitative.Plotly,
+        'marker_color': tiktok_pink,
+        'layout': style_layout
+    }
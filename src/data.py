@@ -0,0 +1,175 @@
+"""Shared, typed data layer for the TikTok dataset.
+
+Every page and script reads the dataset through the loaders here, which load
+it once per snapshot and hand back the same objects. Data comes from the
+snapshot store (see `src.cache`); the CSV is only streamed through
+`src.ingest` when its snapshot is missing or stale. Running processes poll
+the store's `CURRENT` pointer, so a snapshot published by an append replaces
+the loaded data without a restart.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from functools import wraps
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from src.cache import (current_snapshot, is_fresh, read_aggregates,
+                       read_manifest, read_rows)
+from src.schema import clean_dataset
+
+logger = logging.getLogger(__name__)
+
+# TIKTOK_DATA_PATH points the whole app at another scrape, e.g. a benchmark input
+DATA_PATH = Path(os.environ.get(
+    'TIKTOK_DATA_PATH', Path(__file__).resolve().parent.parent / 'data' / 'tiktok_dataset.csv'
+))
+
+# how often a running process checks for a newly published snapshot
+SNAPSHOT_POLL_SECONDS = float(os.environ.get('SNAPSHOT_POLL_SECONDS', 2))
+
+# populated by load_dataset; read through dataset_report()
+_load_stats = {}
+
+# source path -> [last poll time, snapshot directory, whether it was already built]
+_snapshots = {}
+
+# one first-use ingest per process; concurrent workers are settled by publish_snapshot
+_ingest_lock = threading.Lock()
+
+
+def read_raw(path=DATA_PATH):
+    return pd.read_csv(path, index_col='#')
+
+
+def build_dataset(path=DATA_PATH):
+    return clean_dataset(read_raw(path))
+
+
+def snapshot_path(path=DATA_PATH):
+    """Current snapshot directory for `path` and whether it was already built.
+
+    The source is ingested on first use if its snapshot is missing or stale.
+    After that `CURRENT` is re-read at most every `SNAPSHOT_POLL_SECONDS`,
+    which is a single small file read.
+    """
+    now = time.monotonic()
+    state = _snapshots.get(path)
+    if state is None:
+        with _ingest_lock:
+            state = _snapshots.get(path)
+            if state is None:
+                if is_fresh(path):
+                    state = [now, current_snapshot(path), True]
+                else:
+                    from src.ingest import ingest
+                    state = [now, ingest(path), False]
+                _snapshots[path] = state
+    elif now - state[0] >= SNAPSHOT_POLL_SECONDS:
+        state[0] = now
+        snapshot = current_snapshot(path)
+        if snapshot is not None and snapshot != state[1]:
+            logger.info("switching %s to snapshot %s", Path(path).name, snapshot.name)
+            state[1], state[2] = snapshot, True
+    return state[1], state[2]
+
+
+def snapshot_cached(func):
+    """Cache `func(path, ...)` until a newer snapshot of `path` is published.
+
+    A drop-in for `lru_cache` on loaders: results are reused while the
+    snapshot stays current and recomputed once after a swap.
+    """
+    results = {}
+
+    @wraps(func)
+    def wrapper(path=DATA_PATH, *args, **kwargs):
+        snapshot = snapshot_path(path)[0]
+        key = (path, args, tuple(sorted(kwargs.items())))
+        cached = results.get(key)
+        if cached is None or cached[0] != snapshot:
+            cached = results[key] = (snapshot, func(path, *args, **kwargs))
+        return cached[1]
+
+    wrapper.cache_clear = results.clear
+    return wrapper
+
+
+@snapshot_cached
+def load_dataset(path=DATA_PATH, use_cache=True):
+    """Return the cleaned dataset, loading the source at most once per process."""
+    start = time.perf_counter()
+    if use_cache:
+        snapshot, hit = snapshot_path(path)
+        df = read_rows(snapshot)
+        source = 'cache' if hit else 'csv'
+    else:
+        source = 'csv'
+        df = build_dataset(path)
+    elapsed = time.perf_counter() - start
+
+    _load_stats.update({
+        'path': str(path),
+        'source': source,
+        'rows': len(df),
+        'seconds': elapsed,
+        'memory_bytes': int(df.memory_usage(deep=True).sum())
+    })
+    logger.info(
+        "loaded %s rows from %s (%s) in %.3fs (%.1f MB)",
+        f"{len(df):,}", Path(path).name, source, elapsed, _load_stats['memory_bytes'] / 1e6
+    )
+    return df
+
+
+@snapshot_cached
+def load_manifest(path=DATA_PATH):
+    return read_manifest(snapshot_path(path)[0])
+
+
+@snapshot_cached
+def load_aggregates(path=DATA_PATH):
+    """Aggregate arrays accumulated at ingest (see `src.ingest.Aggregator`)."""
+    return read_aggregates(snapshot_path(path)[0])
+
+
+@snapshot_cached
+def load_token_counts(path=DATA_PATH):
+    """Document-term counts for the transcripts, assembled from the snapshot's parts."""
+    # scipy and the tokenizer's wordcloud stopwords load only with this page
+    from scipy import sparse
+
+    from src.tokens import TokenCounts
+
+    snapshot = snapshot_path(path)[0]
+    manifest = load_manifest(path)
+    vocabulary = json.loads((snapshot / 'vocabulary.json').read_text())
+    parts = []
+    for name in manifest['token_parts']:
+        with np.load(snapshot / name) as part:
+            n_rows = len(part['indptr']) - 1
+            parts.append(sparse.csr_matrix(
+                (part['data'], part['indices'], part['indptr']), shape=(n_rows, len(vocabulary))
+            ))
+    matrix = sparse.vstack(parts, format='csr') if parts else sparse.csr_matrix((0, len(vocabulary)))
+    return TokenCounts(vocabulary, matrix)
+
+
+def column_summary(col, path=DATA_PATH):
+    """{count, min, max, sum, sum_sq} of a numeric column, from the ingest summaries."""
+    manifest = load_manifest(path)
+    row = load_aggregates(path)['summaries'][manifest['summary_columns'].index(col)]
+    return dict(zip(manifest['summary_fields'], row.tolist()))
+
+
+def dataset_fingerprint(path=DATA_PATH):
+    """Identifier of the loaded data, for keying caches derived from the dataset."""
+    return snapshot_path(path)[0].name
+
+
+def dataset_report():
+    """Load time and memory footprint of the most recent `load_dataset` call."""
+    return dict(_load_stats)
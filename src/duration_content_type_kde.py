@@ -1,75 +1,94 @@
-import pandas as pd
-import numpy as np
+"""Duration Dynamics: density of video duration per segment.
+
+Shared by the Duration Dynamics page and the figure export
+(`python -m src.export`); running this module exports just this figure.
+"""
 import plotly.graph_objects as go
-from scipy.stats import gaussian_kde
 
-# 1. Load and Clean Data
-df = pd.read_csv('data/tiktok_dataset.csv')
-# Filtering for non-null durations and specific statuses
-df = df[df['video_duration_sec'].notna() & df['claim_status'].isin(['claim', 'opinion'])]
+from src.segments import segment_histograms
+
+colors = {
+    'claim': '#FF0050',
+    'opinion': '#00F2EA',
+    'not verified': '#de8c9d',
+    'verified': '#397684',
+    'active': '#00F2EA',
+    'under review': '#FFA500',
+    'banned': '#FF0050'
+}
+fallback_colors = ['#FF0050', '#00F2EA', '#FFA500', '#de8c9d', '#397684']
+
+
+def build_duration_figure(compare_by='claim_status', selections=None, bw_method=0.3, show_overall=False,
+                          **layout):
+    # every curve is smoothed from summed per-segment histograms; no rows are scanned
+    selections = selections or {}
+    segments = segment_histograms()
+    fig_kde = go.Figure()
+
+    chosen = selections.get(compare_by) or segments.levels[compare_by]
+    for i, label in enumerate(chosen):
+        curve = segments.curve({**selections, compare_by: [label]}, bw_method=bw_method)
+        if curve is None:
+            continue
+        color = colors.get(label, fallback_colors[i % len(fallback_colors)])
+        name = str(label).title()
 
-# 2. Configuration
-colors = {'claim': '#FF0050', 'opinion': '#00F2EA'}
-fig_kde = go.Figure()
+        fig_kde.add_trace(go.Scatter(
+            x=curve.x,
+            y=curve.y,
+            mode='lines',
+            name=name,
+            line=dict(color=color, width=3),
+            fill='tozeroy',
+            hovertemplate=f"{name}<br>Duration: %{{x:.1f}} sec<br>Density: %{{y:.4f}}<extra></extra>"
+        ))
 
-# 3. Kernel Density Estimation (KDE) Calculation
-for label in ['claim', 'opinion']:
-    subset = df[df['claim_status'] == label]['video_duration_sec']
-    
-    # Calculate the density curve
-    kde = gaussian_kde(subset, bw_method=0.3)
-    x_vals = np.linspace(subset.min(), subset.max(), 500)
-    y_vals = kde(x_vals)
+        fig_kde.add_vline(
+            x=curve.median,
+            line=dict(color=color, width=2, dash='dash'),
+            annotation_text=f"{name} Median: {curve.median:.1f}s",
+            annotation_position="top right" if i % 2 == 0 else "top left",
+            annotation_font=dict(color='white', family="Garamond", size=13),
+            annotation=dict(
+                bgcolor='rgba(0,0,0,0.5)',
+                bordercolor=color,
+                borderwidth=1,
+                borderpad=4,
+                showarrow=False
+            ),
+            opacity=0.8
+        )
 
-    # Add the density trace
-    fig_kde.add_trace(go.Scatter(
-        x=x_vals,
-        y=y_vals,
-        mode='lines',
-        name=label.capitalize(),
-        line=dict(color=colors[label], width=3),
-        fill='tozeroy',
-        hovertemplate=f"{label.capitalize()}<br>Duration: %{{x:.1f}} sec<br>Density: %{{y:.4f}}<extra></extra>"
-    ))
+    if show_overall:
+        curve = segments.curve({**selections, compare_by: chosen}, bw_method=bw_method)
+        if curve is not None:
+            fig_kde.add_trace(go.Scatter(
+                x=curve.x,
+                y=curve.y,
+                mode='lines',
+                name='All Selected',
+                line=dict(color='white', width=2, dash='dot'),
+                hovertemplate="All Selected<br>Duration: %{x:.1f} sec<br>Density: %{y:.4f}<extra></extra>"
+            ))
 
-    # Add Median Vertical Line
-    median_val = subset.median()
-    fig_kde.add_vline(
-        x=median_val,
-        line=dict(color=colors[label], width=2, dash='dash'),
-        annotation_text=f"{label.capitalize()} Median: {median_val:.1f}s",
-        annotation_position="top right" if label == 'claim' else "top left",
-        annotation_font=dict(color='white', family="Garamond", size=13),
-        annotation=dict(
-            bgcolor='rgba(0,0,0,0.5)',
-            bordercolor=colors[label],
-            borderwidth=1,
-            borderpad=4,
-            showarrow=False
+    fig_kde.update_layout(
+        font=dict(
+            family="Garamond",
+            color="white"
         ),
-        opacity=0.8
+        autosize=False,
+        height=600,
+        xaxis_title="Video Duration (seconds)",
+        yaxis_title="Density",
+        template="plotly_dark",
+        plot_bgcolor='black',
+        paper_bgcolor='black'
     )
+    fig_kde.update_layout(**layout)
+    return fig_kde
 
-# 4. Styling & Layout
-fig_kde.update_layout(
-    title=dict(
-        text="Duration Dynamics: Claims vs. Opinions",
-        x=0.5,
-        font=dict(size=24)
-    ),
-    font=dict(
-        family="Garamond",
-        color="white"
-    ),
-    xaxis_title="Video Duration (seconds)",
-    yaxis_title="Density",
-    template="plotly_dark",
-    plot_bgcolor='black',
-    paper_bgcolor='black',
-    height=720,
-    margin=dict(t=100, b=50, l=50, r=50)
-)
 
-# 5. Export to HTML
-fig_kde.write_html("results/duration_dynamics.html")
-print("KDE Visualization saved as 'duration_dynamics.html'")
\ No newline at end of file
+if __name__ == '__main__':
+    from src.export import main
+    main(['--only', 'duration_dynamics'])
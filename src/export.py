@@ -0,0 +1,282 @@
+"""Export every static figure to `results/` in one parallel, incremental run.
+
+    python -m src.export [--jobs N] [--out DIR] [--only NAME ...] [--no-segments] [--force]
+
+The dataset snapshot is loaded once in the parent, with its indexes and token
+counts, before a process pool is forked. Each worker renders one figure
+(the Sankey, Duration Dynamics, Correlations or a word cloud) for the whole
+dataset and, unless `--no-segments` is given, for every level of each
+segment column.
+
+Each output's key hashes the snapshot id, the figure parameters and the
+plotly version. Keys are recorded in `<out>/.export-manifest.json`, and an
+output whose file exists under the same key is skipped, so a re-run only
+renders what changed. A word cloud whose segment matched no transcripts has no
+file; it is recorded as `{"key": ..., "empty": true}` and skipped on its key. HTML files share one `plotly.min.js` in the output
+directory unless `--standalone` is given.
+"""
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import plotly
+from plotly.offline import get_plotlyjs
+
+from src.correlations import correlation_figure
+from src.content_journey_sankey import build_sankey_figure
+from src.data import dataset_fingerprint, load_dataset, load_manifest, load_token_counts
+from src.duration_content_type_kde import build_duration_figure
+from src.indexes import bitmap_index, filter_rows, range_index
+from src.lru import cache_key
+from src.schema import CATEGORICAL_COLUMNS, VIEW_TIER_COLUMN
+from src.wordcloud_images import render_wordcloud
+
+logger = logging.getLogger(__name__)
+
+RESULTS_DIR = Path(__file__).resolve().parent.parent / 'results'
+
+MANIFEST_NAME = '.export-manifest.json'
+
+# bump when a renderer changes in a way its parameters do not capture
+EXPORT_VERSION = 1
+
+TITLE_FONT = dict(size=24)
+
+
+def render_sankey(params):
+    title = params.get('title', "TikTok Content Journey")
+    return build_sankey_figure(
+        view_tiers=params.get('view_tiers'),
+        title_text=title,
+        margin=dict(l=30, r=30, b=30, t=50)
+    )
+
+
+def render_duration(params):
+    return build_duration_figure(
+        params.get('compare_by', 'claim_status'),
+        params.get('selections'),
+        bw_method=params.get('bw_method', 0.3),
+        title=dict(text=params['title'], x=0.5, font=TITLE_FONT),
+        autosize=True,
+        height=720,
+        margin=dict(t=100, b=50, l=50, r=50)
+    )
+
+
+def render_correlations(params):
+    rows = filter_rows(params.get('selections', {}), {})
+    return correlation_figure(
+        load_dataset().iloc[rows],
+        params['x_axis'],
+        params['y_axis'],
+        params.get('color_by', 'none'),
+        log_scale=params.get('scale') == 'log',
+        title=dict(text=params['title'], x=0.5, font=TITLE_FONT),
+        height=720
+    )
+
+
+def render_wordcloud_image(params):
+    return render_wordcloud(filter_rows(params.get('selections', {}), {}))
+
+
+# figure kind -> (renderer, output suffix)
+RENDERERS = {
+    'sankey': (render_sankey, '.html'),
+    'duration': (render_duration, '.html'),
+    'correlations': (render_correlations, '.html'),
+    'wordcloud': (render_wordcloud_image, '.webp'),
+}
+
+
+def slug(value):
+    return re.sub(r'[^a-z0-9]+', '-', str(value).lower()).strip('-')
+
+
+def export_jobs(segments=True):
+    """(output name, figure kind, params) for every figure to export."""
+    jobs = [
+        ('tiktok_sankey', 'sankey', {}),
+        ('duration_dynamics', 'duration', {
+            'selections': {'claim_status': ['claim', 'opinion']},
+            'title': "Duration Dynamics: Claims vs. Opinions"
+        }),
+        ('correlations', 'correlations', {
+            'x_axis': 'video_view_count', 'y_axis': 'video_like_count',
+            'color_by': 'claim_status', 'scale': 'log',
+            'title': "Views vs. Likes"
+        }),
+        ('wordcloud', 'wordcloud', {}),
+    ]
+    if not segments:
+        return jobs
+
+    levels = dict(zip(CATEGORICAL_COLUMNS + [VIEW_TIER_COLUMN], load_manifest()['segment_levels']))
+    for col, col_levels in levels.items():
+        # compare durations along the next segment column
+        compare_by = CATEGORICAL_COLUMNS[(CATEGORICAL_COLUMNS.index(col) + 1) % len(CATEGORICAL_COLUMNS)] \
+            if col in CATEGORICAL_COLUMNS else 'claim_status'
+        for level in col_levels:
+            name = f'{slug(col)}-{slug(level)}'
+            label = str(level).title()
+            selections = {col: [level]}
+            jobs.append((f'duration_dynamics-{name}', 'duration', {
+                'compare_by': compare_by, 'selections': selections,
+                'title': f"Duration Dynamics: {label}"
+            }))
+            if col == VIEW_TIER_COLUMN:
+                jobs.append((f'tiktok_sankey-{name}', 'sankey', {
+                    'view_tiers': [level], 'title': f"TikTok Content Journey: {label} Views"
+                }))
+                continue
+            jobs.append((f'correlations-{name}', 'correlations', {
+                'x_axis': 'video_view_count', 'y_axis': 'video_like_count',
+                'color_by': 'claim_status' if col != 'claim_status' else 'verified_status',
+                'scale': 'log', 'selections': selections,
+                'title': f"Views vs. Likes: {label}"
+            }))
+            jobs.append((f'wordcloud-{name}', 'wordcloud', {'selections': selections}))
+    return jobs
+
+
+def job_key(kind, params, include_plotlyjs):
+    return cache_key(EXPORT_VERSION, dataset_fingerprint(), plotly.__version__,
+                     include_plotlyjs, kind, params)
+
+
+def read_export_manifest(out):
+    try:
+        return json.loads((out / MANIFEST_NAME).read_text())
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def is_current(entry, key, path):
+    """Whether manifest `entry` records `key` and its output is still in place."""
+    if isinstance(entry, dict):
+        # an empty result has no file to check
+        return entry.get('key') == key and entry.get('empty', False)
+    return entry == key and path.exists()
+
+
+def write_atomic(path, write):
+    tmp = path.with_name(f'.{path.name}.{os.getpid()}.tmp')
+    try:
+        write(tmp)
+        os.replace(tmp, path)
+    finally:
+        tmp.unlink(missing_ok=True)
+
+
+def render_job(out, filename, kind, params, include_plotlyjs):
+    """Render one figure to `out / filename`; runs in a pool worker.
+
+    Returns the filename, the seconds taken and whether the result was empty.
+    """
+    start = time.perf_counter()
+    renderer, suffix = RENDERERS[kind]
+    result = renderer(params)
+    path = out / filename
+    empty = False
+    if suffix == '.html':
+        write_atomic(path, lambda tmp: result.write_html(tmp, include_plotlyjs=include_plotlyjs))
+    elif result:
+        write_atomic(path, lambda tmp: tmp.write_bytes(result))
+    else:
+        # nothing matched the segment; drop any stale image
+        path.unlink(missing_ok=True)
+        empty = True
+    return filename, time.perf_counter() - start, empty
+
+
+def warm():
+    """Load everything the renderers read, so forked workers inherit it."""
+    load_dataset()
+    load_token_counts()
+    bitmap_index()
+    range_index()
+
+
+def export(out=RESULTS_DIR, jobs=None, only=None, segments=True, force=False, standalone=False):
+    """Render stale figures into `out`; returns (rendered, skipped) filenames."""
+    start = time.perf_counter()
+    out = Path(out)
+    out.mkdir(parents=True, exist_ok=True)
+    warm()
+
+    include_plotlyjs = True if standalone else 'directory'
+    if not standalone and not (out / 'plotly.min.js').exists():
+        # written once here rather than racing from every worker
+        write_atomic(out / 'plotly.min.js', lambda tmp: tmp.write_text(get_plotlyjs(), encoding='utf-8'))
+
+    manifest = read_export_manifest(out)
+    pending, skipped = [], []
+    for name, kind, params in export_jobs(segments):
+        if only and name not in only:
+            continue
+        filename = name + RENDERERS[kind][1]
+        key = job_key(kind, params, include_plotlyjs)
+        if not force and is_current(manifest.get(filename), key, out / filename):
+            skipped.append(filename)
+        else:
+            pending.append((filename, kind, params, key))
+
+    rendered = []
+    if pending:
+        workers = min(jobs or os.cpu_count() or 1, len(pending))
+        if workers == 1:
+            results = (render_job(out, f, kind, params, include_plotlyjs) for f, kind, params, _ in pending)
+        else:
+            # forked workers share the parent's loaded snapshot and indexes
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context('fork' if 'fork' in methods else None)
+            pool = ProcessPoolExecutor(max_workers=workers, mp_context=context)
+            futures = [pool.submit(render_job, out, f, kind, params, include_plotlyjs)
+                       for f, kind, params, _ in pending]
+            results = (future.result() for future in as_completed(futures))
+
+        keys = {filename: key for filename, _, _, key in pending}
+        try:
+            for filename, seconds, empty in results:
+                manifest[filename] = {'key': keys[filename], 'empty': True} if empty else keys[filename]
+                rendered.append(filename)
+                logger.info("rendered %s in %.2fs", filename, seconds)
+        finally:
+            if workers > 1:
+                pool.shutdown(cancel_futures=True)
+            # record whatever finished, so an interrupted run resumes from there
+            write_atomic(out / MANIFEST_NAME, lambda tmp: tmp.write_text(json.dumps(manifest, indent=2)))
+
+    logger.info(
+        "exported %d figures (%d up to date) to %s in %.2fs",
+        len(rendered), len(skipped), out, time.perf_counter() - start
+    )
+    return rendered, skipped
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export the dashboard's figures as static files.")
+    parser.add_argument('--out', default=str(RESULTS_DIR), help="output directory")
+    parser.add_argument('--jobs', '-j', type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument('--only', nargs='+', metavar='NAME', help="export only these outputs, e.g. tiktok_sankey")
+    parser.add_argument('--no-segments', dest='segments', action='store_false',
+                        help="skip the per-segment variants")
+    parser.add_argument('--force', action='store_true', help="re-render outputs that are up to date")
+    parser.add_argument('--standalone', action='store_true',
+                        help="embed plotly.js in every HTML file instead of sharing plotly.min.js")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    export(args.out, jobs=args.jobs, only=args.only, segments=args.segments,
+           force=args.force, standalone=args.standalone)
+
+
+if __name__ == '__main__':
+    main()
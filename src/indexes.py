@@ -0,0 +1,273 @@
+"""Precomputed row indexes for the dashboard's filter controls.
+
+Filters resolve to sets of row positions in the shared dataset, so callbacks
+can slice just the matching rows instead of copying and masking the frame.
+
+When an appended snapshot replaces the loaded one, each index is extended
+with the new tail of rows instead of being rebuilt (see `current_index`).
+"""
+import numpy as np
+
+from src.data import load_dataset, load_manifest, snapshot_path
+from src.schema import CATEGORICAL_COLUMNS, COUNT_COLUMNS
+
+
+class BitmapIndex:
+    """One packed bitset per value of each categorical column.
+
+    Values selected within a column are OR-ed together and the per-column
+    results are AND-ed, so a filter costs a few byte-wise operations over
+    n/8 bytes and never compares strings.
+    """
+
+    def __init__(self, df, columns=CATEGORICAL_COLUMNS):
+        self.n_rows = len(df)
+        self.bitmaps = {}
+        for col in columns:
+            codes = df[col].cat.codes.to_numpy()
+            self.bitmaps[col] = {
+                value: np.packbits(codes == code)
+                for code, value in enumerate(df[col].cat.categories)
+            }
+        self._all = np.packbits(np.ones(self.n_rows, dtype=bool))
+
+    def extend(self, df):
+        """A new index over `df`, whose first `n_rows` rows are the indexed ones."""
+        index = object.__new__(BitmapIndex)
+        index.n_rows = len(df)
+        index.bitmaps = {}
+        offset = self.n_rows % 8
+        for col, bitmaps in self.bitmaps.items():
+            codes = df[col].cat.codes.to_numpy()[self.n_rows:]
+            index.bitmaps[col] = {}
+            for code, value in enumerate(df[col].cat.categories):
+                old = bitmaps.get(value)
+                if old is None:
+                    old = np.zeros((self.n_rows + 7) // 8, dtype=np.uint8)
+                # pad the new bits so they start mid-byte where the old ones end
+                new = np.packbits(np.concatenate([np.zeros(offset, dtype=bool), codes == code]))
+                if offset:
+                    new[0] |= old[-1]
+                    old = old[:-1]
+                index.bitmaps[col][value] = np.concatenate([old, new])
+        index._all = np.packbits(np.ones(index.n_rows, dtype=bool))
+        return index
+
+    def column_bits(self, col, values):
+        """Bitset of rows whose `col` is any of `values`; empty means no filter."""
+        if not values:
+            return self._all
+        bits = np.zeros_like(self._all)
+        for value in values:
+            if value in self.bitmaps[col]:
+                np.bitwise_or(bits, self.bitmaps[col][value], out=bits)
+        return bits
+
+    def select_bits(self, selections):
+        """AND together the column bitsets for a {column: values} mapping."""
+        bits = self._all.copy()
+        for col, values in selections.items():
+            if values:
+                np.bitwise_and(bits, self.column_bits(col, values), out=bits)
+        return bits
+
+    def select(self, selections):
+        """Sorted row positions matching a {column: values} mapping."""
+        bits = self.select_bits(selections)
+        return np.flatnonzero(np.unpackbits(bits, count=self.n_rows))
+
+    def canonical(self, col, values):
+        """Sorted known values, or None when the selection does not filter."""
+        known = sorted(set(values or ()) & self.bitmaps[col].keys())
+        if not values or len(known) == len(self.bitmaps[col]):
+            return None
+        return known
+
+    def count(self, selections):
+        return int(np.bitwise_count(self.select_bits(selections)).sum())
+
+
+class SortedRangeIndex:
+    """Argsort order plus sorted values for each numeric column.
+
+    A slider range becomes two `searchsorted` calls and a slice of the order
+    array. When several ranges are active, the narrowest slice is taken first
+    and the remaining ranges (and an optional bitmap) are checked only on
+    those candidates, so the cost follows the result size rather than the
+    number of rows.
+    """
+
+    def __init__(self, df, columns=COUNT_COLUMNS):
+        self.n_rows = len(df)
+        index_dtype = np.int32 if self.n_rows < 2**31 else np.int64
+        self.values = {}
+        self.order = {}
+        self.sorted_values = {}
+        for col in columns:
+            values = df[col].to_numpy()
+            order = np.argsort(values, kind='stable').astype(index_dtype)
+            self.values[col] = values
+            self.order[col] = order
+            self.sorted_values[col] = values[order]
+
+    def extend(self, df):
+        """A new index over `df`, merging its rows past `n_rows` into the sorted order."""
+        index = object.__new__(SortedRangeIndex)
+        index.n_rows = len(df)
+        index.values, index.order, index.sorted_values = {}, {}, {}
+        for col, order in self.order.items():
+            values = df[col].to_numpy()
+            new_order = self.n_rows + np.argsort(values[self.n_rows:], kind='stable')
+            new_values = values[new_order]
+            # side='right' keeps ties in row order, as a stable argsort would
+            at = np.searchsorted(self.sorted_values[col], new_values, side='right')
+            index.values[col] = values
+            index.order[col] = np.insert(order, at, new_order.astype(order.dtype))
+            index.sorted_values[col] = np.insert(self.sorted_values[col], at, new_values)
+        return index
+
+    def _span(self, col, lo, hi):
+        sorted_values = self.sorted_values[col]
+        return (np.searchsorted(sorted_values, lo, side='left'),
+                np.searchsorted(sorted_values, hi, side='right'))
+
+    def canonical(self, col, bound):
+        """The `[start, stop)` slice of sorted values a range selects.
+
+        Ranges that select the same rows map to the same slice, and full-span
+        ranges map to None.
+        """
+        if not bound:
+            return None
+        start, stop = self._span(col, *bound)
+        if start == 0 and stop == self.n_rows:
+            return None
+        return [int(start), int(stop)]
+
+    def rows(self, col, lo, hi):
+        """Unsorted row positions with `lo <= col <= hi`."""
+        start, stop = self._span(col, lo, hi)
+        return self.order[col][start:stop]
+
+    def select(self, ranges, bits=None):
+        """Sorted row positions inside every (lo, hi) range and set in `bits`.
+
+        `ranges` maps column to a `[lo, hi]` pair; missing or full-span ranges
+        are ignored. `bits` is a packed bitset such as `BitmapIndex.select_bits`
+        returns.
+        """
+        spans = {}
+        for col, bound in ranges.items():
+            if not bound:
+                continue
+            lo, hi = bound
+            start, stop = self._span(col, lo, hi)
+            if start > 0 or stop < self.n_rows:
+                spans[col] = (start, stop, lo, hi)
+
+        if not spans:
+            if bits is None:
+                return np.arange(self.n_rows)
+            return np.flatnonzero(np.unpackbits(bits, count=self.n_rows))
+
+        narrowest = min(spans, key=lambda col: spans[col][1] - spans[col][0])
+        start, stop, _, _ = spans.pop(narrowest)
+        rows = self.order[narrowest][start:stop]
+
+        for col, (_, _, lo, hi) in spans.items():
+            values = self.values[col][rows]
+            rows = rows[(values >= lo) & (values <= hi)]
+        if bits is not None:
+            rows = rows[(bits[rows >> 3] >> (7 - (rows & 7))) & 1 == 1]
+        rows.sort()
+        return rows
+
+
+class RecordIndex:
+    """Row lookup by `video_id` through a sorted id array."""
+
+    def __init__(self, df, key='video_id'):
+        self.df = df
+        self.key = key
+        ids = df[key].to_numpy()
+        self.order = np.argsort(ids, kind='stable')
+        self.sorted_ids = ids[self.order]
+
+    def extend(self, df):
+        """A new index over `df`, merging its ids past the indexed rows."""
+        index = object.__new__(RecordIndex)
+        index.df = df
+        index.key = self.key
+        n_rows = len(self.df)
+        ids = df[self.key].to_numpy()
+        new_order = n_rows + np.argsort(ids[n_rows:], kind='stable')
+        at = np.searchsorted(self.sorted_ids, ids[new_order], side='right')
+        index.order = np.insert(self.order, at, new_order)
+        index.sorted_ids = np.insert(self.sorted_ids, at, ids[new_order])
+        return index
+
+    def row(self, video_id):
+        """Row position of `video_id`, or None if it is not in the dataset."""
+        pos = np.searchsorted(self.sorted_ids, video_id)
+        if pos < len(self.sorted_ids) and self.sorted_ids[pos] == video_id:
+            return int(self.order[pos])
+        return None
+
+    def record(self, video_id):
+        """The full record for `video_id` as a plain dict, or None."""
+        row = self.row(video_id)
+        if row is None:
+            return None
+        return {col: value.item() if hasattr(value, 'item') else value
+                for col, value in self.df.iloc[row].items()}
+
+
+# index class -> (snapshot directory, index)
+_indexes = {}
+
+
+def current_index(cls):
+    """`cls` built over the current snapshot's rows.
+
+    If the cached index belongs to a snapshot that the current one was
+    appended to, it is extended with the appended rows; otherwise it is
+    rebuilt.
+    """
+    snapshot = snapshot_path()[0]
+    cached = _indexes.get(cls)
+    if cached is not None and cached[0] == snapshot:
+        return cached[1]
+
+    df = load_dataset()
+    if cached is not None and cached[0].name in load_manifest().get('lineage', []):
+        index = cached[1].extend(df)
+    else:
+        index = cls(df)
+    _indexes[cls] = (snapshot, index)
+    return index
+
+
+def bitmap_index():
+    return current_index(BitmapIndex)
+
+
+def range_index():
+    return current_index(SortedRangeIndex)
+
+
+def record_index():
+    return current_index(RecordIndex)
+
+
+def filter_key(selections, ranges):
+    """Canonical form of a filter state; equivalent filters give equal keys."""
+    bitmaps, sorted_ranges = bitmap_index(), range_index()
+    return {
+        **{col: bitmaps.canonical(col, values) for col, values in selections.items()},
+        **{col: sorted_ranges.canonical(col, bound) for col, bound in ranges.items()}
+    }
+
+
+def filter_rows(selections, ranges):
+    """Row positions matching categorical `selections` and numeric `ranges`."""
+    return range_index().select(ranges, bitmap_index().select_bits(selections))
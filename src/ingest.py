@@ -0,0 +1,379 @@
+"""Chunked, bounded-memory build of the dataset snapshot.
+
+The source CSV is read in chunks. Each chunk is cleaned with categories
+shared across chunks, appended to the snapshot's Arrow row file, tokenized
+into a document-term count part, and folded into running aggregates:
+
+* per-segment (claim x verified x ban x view tier) row counts, which are the
+  Sankey contingency tables,
+* per-segment duration histograms at `DURATION_RESOLUTION` with the count,
+  sum and sum of squares of each segment,
+* per-segment cross-product matrices of the count columns, raw and log1p,
+  from which `src.moments` builds correlation matrices,
+* count, min, max, sum and sum of squares of every numeric column.
+
+Only the current chunk and these small accumulators are held in memory, so
+peak memory stays roughly flat as the input grows. Run it ahead of time for
+large scrapes with `python -m src.ingest [path] [--chunksize N]`; pages
+otherwise trigger it on first load.
+
+New scrape batches are added with `python -m src.ingest --append batch.csv`.
+`append` restores the aggregator from the current snapshot, drops batch rows
+whose `video_id` is already stored, and writes only the new rows as extra
+parts next to hard links of the existing ones. The appended snapshot is
+published like a full build, and running workers switch to it on their next
+poll of `CURRENT` (see `src.data.snapshot_path`).
+"""
+import argparse
+import hashlib
+import json
+import logging
+import shutil
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from src.cache import (CACHE_DIR, CACHE_VERSION, HashingReader, current_snapshot, is_fresh,
+                       link_or_copy, new_snapshot_dir, publish_snapshot, read_aggregates,
+                       read_column, read_current, read_manifest, read_schema, source_stat)
+from src.schema import (CATEGORICAL_COLUMNS, COLUMNS, COUNT_COLUMNS, ID_COLUMN, TEXT_COLUMN,
+                        VIEW_TIER_LABELS, clean_dataset, view_tiers)
+from src.moments import MOMENTS_SHAPE, moment_matrices
+from src.tokens import count_documents
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNKSIZE = 250_000
+
+# durations are whole seconds, so finer bins would only ever be empty
+DURATION_RESOLUTION = 1
+
+# codes are stored as int16, so each segment dimension fits in this radix
+_RADIX = 1 << 16
+
+SUMMARY_FIELDS = ['count', 'min', 'max', 'sum', 'sum_sq']
+
+
+class Aggregator:
+    """Running aggregates over cleaned chunks; merge-able by addition."""
+
+    def __init__(self):
+        self.categories = {}
+        self.positions = {}
+        self.rows = 0
+        self.segments = {}
+        self.summaries = np.zeros((len(COUNT_COLUMNS), len(SUMMARY_FIELDS)))
+        self.summaries[:, 1] = np.inf
+        self.summaries[:, 2] = -np.inf
+
+    @classmethod
+    def from_snapshot(cls, snapshot, manifest=None):
+        """Aggregator holding the state a published snapshot was built from."""
+        snapshot = Path(snapshot)
+        manifest = read_manifest(snapshot) if manifest is None else manifest
+        arrays = read_aggregates(snapshot)
+        if float(arrays['duration_resolution']) != DURATION_RESOLUTION:
+            raise ValueError(f"{snapshot} was built at a different duration resolution")
+
+        aggregator = cls()
+        aggregator.categories = {col: list(values) for col, values in manifest['categories'].items()}
+        vocabulary = json.loads((snapshot / 'vocabulary.json').read_text())
+        aggregator.positions = {word: i for i, word in enumerate(vocabulary)}
+        aggregator.rows = manifest['rows']
+        aggregator.summaries = arrays['summaries'].copy()
+
+        counts = arrays['segment_counts']
+        for index in zip(*np.nonzero(counts)):
+            key = 0
+            for code in index:
+                key = key * _RADIX + int(code)
+            aggregator.segments[key] = [
+                int(counts[index]),
+                float(arrays['duration_totals'][index]),
+                float(arrays['duration_totals_sq'][index]),
+                arrays['duration_hists'][index].astype(np.int64),
+                arrays['segment_moments'][index].copy()
+            ]
+        return aggregator
+
+    def add(self, df):
+        self.rows += len(df)
+        self._add_summaries(df)
+        self._add_segments(df)
+
+    def _add_summaries(self, df):
+        if df.empty:
+            return
+        for i, col in enumerate(COUNT_COLUMNS):
+            values = df[col].to_numpy(dtype=np.float64)
+            count, lo, hi, total, total_sq = self.summaries[i]
+            self.summaries[i] = [
+                count + len(values), min(lo, values.min()), max(hi, values.max()),
+                total + values.sum(), total_sq + (values ** 2).sum()
+            ]
+
+    def _add_segments(self, df):
+        codes = [df[col].cat.codes.to_numpy().astype(np.int64) for col in CATEGORICAL_COLUMNS]
+        codes.append(view_tiers(df['video_view_count']).cat.codes.to_numpy().astype(np.int64))
+        valid = np.logical_and.reduce([c >= 0 for c in codes])
+
+        keys = np.zeros(int(valid.sum()), dtype=np.int64)
+        for c in codes:
+            keys = keys * _RADIX + c[valid]
+        durations = df['video_duration_sec'].to_numpy(dtype=np.float64)[valid]
+        if not len(keys):
+            return
+        values = df[COUNT_COLUMNS].to_numpy(dtype=np.float64)[valid]
+
+        segments, inverse = np.unique(keys, return_inverse=True)
+        fine = np.rint(durations / DURATION_RESOLUTION).astype(np.int64)
+        width = int(fine.max()) + 1
+        hists = np.bincount(inverse * width + fine, minlength=len(segments) * width)
+        hists = hists.reshape(len(segments), width)
+        count = np.bincount(inverse, minlength=len(segments))
+        total = np.bincount(inverse, durations, minlength=len(segments))
+        total_sq = np.bincount(inverse, durations ** 2, minlength=len(segments))
+        # rows grouped by segment, in segment order
+        blocks = np.split(values[np.argsort(inverse, kind='stable')], np.cumsum(count)[:-1])
+
+        for k, key in enumerate(segments.tolist()):
+            entry = self.segments.setdefault(key, [0, 0.0, 0.0, np.zeros(0, dtype=np.int64), np.zeros(MOMENTS_SHAPE)])
+            entry[0] += int(count[k])
+            entry[1] += float(total[k])
+            entry[2] += float(total_sq[k])
+            hist = entry[3]
+            if len(hist) < width:
+                hist = np.pad(hist, (0, width - len(hist)))
+            hist[:width] += hists[k]
+            entry[3] = hist
+            entry[4] += moment_matrices(blocks[k])
+
+    def levels(self):
+        return [list(self.categories.get(col, [])) for col in CATEGORICAL_COLUMNS] + [VIEW_TIER_LABELS]
+
+    def arrays(self):
+        """Dense aggregate arrays indexed [claim, verified, ban, view tier, ...]."""
+        shape = tuple(len(levels) for levels in self.levels())
+        width = max((len(entry[3]) for entry in self.segments.values()), default=1)
+        counts = np.zeros(shape, dtype=np.int64)
+        totals = np.zeros(shape)
+        totals_sq = np.zeros(shape)
+        hists = np.zeros(shape + (width,), dtype=np.int64)
+        moments = np.zeros(shape + MOMENTS_SHAPE)
+        for key, (count, total, total_sq, hist, segment_moments) in self.segments.items():
+            index = []
+            for _ in shape:
+                key, code = divmod(key, _RADIX)
+                index.append(code)
+            index = tuple(reversed(index))
+            counts[index] = count
+            totals[index] = total
+            totals_sq[index] = total_sq
+            hists[index][:len(hist)] = hist
+            moments[index] = segment_moments
+        return {
+            'segment_counts': counts,
+            'duration_totals': totals,
+            'duration_totals_sq': totals_sq,
+            'duration_hists': hists,
+            'duration_resolution': np.array(DURATION_RESOLUTION),
+            'segment_moments': moments,
+            'summaries': self.summaries
+        }
+
+
+def _codes_frame(df):
+    """Cleaned chunk with categoricals replaced by their int16 codes."""
+    out = df.copy()
+    for col in CATEGORICAL_COLUMNS:
+        out[col] = df[col].cat.codes.astype(np.int16)
+    return out
+
+
+class SnapshotWriter:
+    """Writes the row and token parts of a snapshot being built."""
+
+    def __init__(self, build_dir, aggregator, part=0, token_part=0, schema=None):
+        self.build_dir = Path(build_dir)
+        self.aggregator = aggregator
+        self.row_part = f'rows-{part:05d}.arrow'
+        self.token_parts = []
+        self._next_token_part = token_part
+        self._sink = None
+        self._writer = None
+        # appended parts reuse the parent's schema so all parts concatenate
+        self._schema = schema
+
+    @property
+    def started(self):
+        return self._writer is not None
+
+    def write(self, df):
+        table = pa.Table.from_pandas(_codes_frame(df), preserve_index=False)
+        if self._writer is None:
+            self._schema = self._schema or table.schema
+            self._sink = pa.OSFile(str(self.build_dir / self.row_part), 'wb')
+            self._writer = pa.ipc.new_file(self._sink, self._schema)
+        self._writer.write_table(table.cast(self._schema))
+
+        matrix = count_documents(df[TEXT_COLUMN], self.aggregator.positions)
+        name = f'tokens-{self._next_token_part:05d}.npz'
+        np.savez(self.build_dir / name, data=matrix.data, indices=matrix.indices, indptr=matrix.indptr)
+        self.token_parts.append(name)
+        self._next_token_part += 1
+
+        self.aggregator.add(df)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._sink.close()
+
+
+def write_metadata(build_dir, aggregator, row_parts, token_parts, extra=None):
+    build_dir = Path(build_dir)
+    np.savez(build_dir / 'aggregates.npz', **aggregator.arrays())
+    (build_dir / 'vocabulary.json').write_text(json.dumps(list(aggregator.positions)))
+    manifest = {
+        'version': CACHE_VERSION,
+        'rows': aggregator.rows,
+        'columns': COLUMNS,
+        'categories': {col: aggregator.categories.get(col, []) for col in CATEGORICAL_COLUMNS},
+        'segment_levels': aggregator.levels(),
+        'summary_columns': COUNT_COLUMNS,
+        'summary_fields': SUMMARY_FIELDS,
+        'row_parts': row_parts,
+        'token_parts': token_parts,
+        **(extra or {})
+    }
+    (build_dir / 'manifest.json').write_text(json.dumps(manifest))
+    return manifest
+
+
+def ingest(source, cache_dir=CACHE_DIR, chunksize=DEFAULT_CHUNKSIZE):
+    """Stream `source` into a new snapshot and publish it; returns its directory."""
+    start = time.perf_counter()
+    stat = source_stat(source)
+    build_dir = new_snapshot_dir(source, cache_dir)
+    aggregator = Aggregator()
+    writer = SnapshotWriter(build_dir, aggregator)
+    try:
+        with HashingReader(source) as reader:
+            for raw in pd.read_csv(reader, index_col='#', chunksize=chunksize):
+                writer.write(clean_dataset(raw, aggregator.categories))
+            digest = reader.hexdigest()
+        if not writer.started:
+            # empty source; still write a schema-only row part
+            writer.write(clean_dataset(pd.read_csv(source, index_col='#', nrows=0)))
+        writer.close()
+        write_metadata(build_dir, aggregator, [writer.row_part], writer.token_parts,
+                       extra={'sources': [{'path': str(source), 'hash': digest}], 'lineage': []})
+    except BaseException:
+        writer.close()
+        shutil.rmtree(build_dir, ignore_errors=True)
+        raise
+
+    snapshot = publish_snapshot(source, build_dir, digest, {'hash': digest, **stat}, cache_dir)
+    logger.info(
+        "ingested %s rows from %s in %.2fs into %s",
+        f"{aggregator.rows:,}", Path(source).name, time.perf_counter() - start, snapshot.name
+    )
+    return snapshot
+
+
+def _unseen(ids, seen):
+    """Mask of `ids` missing from the sorted array `seen`."""
+    pos = np.searchsorted(seen, ids)
+    found = pos < len(seen)
+    found[found] = seen[pos[found]] == ids[found]
+    return ~found
+
+
+def append(batch, source, cache_dir=CACHE_DIR, chunksize=DEFAULT_CHUNKSIZE):
+    """Add the rows of `batch` not already stored to `source`'s snapshot.
+
+    Rows are deduplicated by `video_id` against the current snapshot and
+    within the batch (first occurrence wins). Returns the new snapshot's
+    directory, or the current one when the batch adds nothing.
+    """
+    start = time.perf_counter()
+    parent = current_snapshot(source, cache_dir)
+    if parent is None:
+        raise FileNotFoundError(f"no snapshot for {source}; run the ingest step first")
+    manifest = read_manifest(parent)
+    aggregator = Aggregator.from_snapshot(parent, manifest)
+    seen = np.sort(read_column(parent, ID_COLUMN, manifest))
+
+    build_dir = new_snapshot_dir(source, cache_dir)
+    writer = SnapshotWriter(build_dir, aggregator, part=len(manifest['row_parts']),
+                            token_part=len(manifest['token_parts']),
+                            schema=read_schema(parent, manifest))
+    added = 0
+    try:
+        with HashingReader(batch) as reader:
+            for raw in pd.read_csv(reader, index_col='#', chunksize=chunksize):
+                df = clean_dataset(raw, aggregator.categories).drop_duplicates(ID_COLUMN)
+                ids = df[ID_COLUMN].to_numpy()
+                keep = _unseen(ids, seen)
+                if not keep.any():
+                    continue
+                df = df[keep].reset_index(drop=True)
+                new_ids = np.sort(ids[keep])
+                seen = np.insert(seen, np.searchsorted(seen, new_ids), new_ids)
+                writer.write(df)
+                added += len(df)
+            digest = reader.hexdigest()
+        writer.close()
+
+        if not added:
+            shutil.rmtree(build_dir)
+            logger.info("%s adds no new rows to %s", Path(batch).name, parent.name)
+            return parent
+
+        for name in manifest['row_parts'] + manifest['token_parts']:
+            link_or_copy(parent / name, build_dir / name)
+        write_metadata(
+            build_dir, aggregator, manifest['row_parts'] + [writer.row_part],
+            manifest['token_parts'] + writer.token_parts,
+            extra={
+                'sources': manifest['sources'] + [{'path': str(batch), 'hash': digest}],
+                'lineage': manifest['lineage'] + [parent.name]
+            }
+        )
+    except BaseException:
+        writer.close()
+        shutil.rmtree(build_dir, ignore_errors=True)
+        raise
+
+    snapshot_id = hashlib.blake2b(f'{parent.name}:{digest}'.encode(), digest_size=16).hexdigest()
+    current = {k: v for k, v in read_current(source, cache_dir).items() if k not in ('version', 'snapshot')}
+    snapshot = publish_snapshot(source, build_dir, snapshot_id, current, cache_dir)
+    logger.info(
+        "appended %s of %s rows from %s in %.2fs into %s",
+        f"{added:,}", f"{aggregator.rows:,}", Path(batch).name, time.perf_counter() - start, snapshot.name
+    )
+    return snapshot
+
+
+def main():
+    from src.data import DATA_PATH
+
+    parser = argparse.ArgumentParser(description="Build the dataset snapshot in bounded memory.")
+    parser.add_argument('source', nargs='?', default=str(DATA_PATH), help="CSV to ingest")
+    parser.add_argument('--append', metavar='BATCH', action='append', default=[],
+                        help="add a scrape batch to the current snapshot instead of rebuilding; repeatable")
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE, help="rows per chunk")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if not args.append or not is_fresh(args.source):
+        ingest(args.source, chunksize=args.chunksize)
+    for batch in args.append:
+        append(batch, args.source, chunksize=args.chunksize)
+
+
+if __name__ == '__main__':
+    main()
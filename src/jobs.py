@@ -0,0 +1,49 @@
+"""Disk-backed manager for the dashboard's background callbacks.
+
+A background callback runs in its own process, so a slow render never holds
+a Flask worker and cheap callbacks keep answering while it runs. Job state,
+progress and results live in a `diskcache` directory under
+`data/.cache/jobs`, shared by every worker on the host.
+
+A job's own process is never scraped, so it queues its timings with
+`report_job` and the next worker to serve `/metrics` records them.
+"""
+from src.cache import CACHE_DIR
+
+JOBS_DIR = CACHE_DIR / 'jobs'
+REPORTS_DIR = JOBS_DIR / 'reports'
+
+# results are collected as soon as a job finishes; older entries were abandoned
+JOB_EXPIRE_SECONDS = 600
+
+# reports beyond this are dropped rather than queued while nothing scrapes
+MAX_PENDING_REPORTS = 10000
+
+
+def background_manager(directory=JOBS_DIR):
+    import diskcache
+    from dash import DiskcacheManager
+
+    return DiskcacheManager(diskcache.Cache(directory), expire=JOB_EXPIRE_SECONDS)
+
+
+def report_job(callback, seconds, stages):
+    """Queue the timings of a finished job of `callback` for `/metrics`."""
+    import diskcache
+
+    with diskcache.Cache(REPORTS_DIR) as reports:
+        if len(reports) < MAX_PENDING_REPORTS:
+            reports.push({'callback': callback, 'seconds': seconds, 'stages': stages})
+
+
+def pending_job_reports():
+    """Take every queued job report, oldest first."""
+    import diskcache
+
+    taken = []
+    with diskcache.Cache(REPORTS_DIR) as reports:
+        while True:
+            _, report = reports.pull()
+            if report is None:
+                return taken
+            taken.append(report)
@@ -0,0 +1,130 @@
+"""Two-tier LRU cache for rendered byte payloads such as word cloud images.
+
+The memory tier is a per-process LRU bounded by total bytes. The disk tier is
+a directory shared by every worker on the host, also bounded by bytes and
+pruned least recently used first (reads bump the file's mtime). Entries
+promoted from disk are copied back into memory, so a view rendered by one
+worker is served by all of them. Keys are the hex digests `cache_key` makes,
+since they become file names; anything else raises `ValueError`.
+"""
+import hashlib
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+KEY_PATTERN = re.compile(r'[0-9a-f]{32}')
+
+
+def cache_key(*parts):
+    """Stable hex key for any JSON-serializable parts."""
+    payload = json.dumps(parts, sort_keys=True, default=str, separators=(',', ':'))
+    return hashlib.blake2b(payload.encode(), digest_size=16).hexdigest()
+
+
+class TwoTierLRU:
+
+    def __init__(self, directory, memory_bytes=64 << 20, disk_bytes=512 << 20, suffix='.bin'):
+        self.directory = Path(directory)
+        self.memory_bytes = memory_bytes
+        self.disk_bytes = disk_bytes
+        self.suffix = suffix
+        self._memory = OrderedDict()
+        self._memory_used = 0
+        self._lock = threading.Lock()
+        self._counters = {
+            'memory_hits': 0,
+            'disk_hits': 0,
+            'misses': 0,
+            'memory_evictions': 0,
+            'disk_evictions': 0
+        }
+
+    def _path(self, key):
+        # keys become file names, so nothing else may reach the disk tier
+        if not isinstance(key, str) or not KEY_PATTERN.fullmatch(key):
+            raise ValueError(f"invalid cache key: {key!r}")
+        return self.directory / f'{key}{self.suffix}'
+
+    def _remember(self, key, value):
+        # caller holds the lock
+        if len(value) > self.memory_bytes:
+            return
+        if key in self._memory:
+            self._memory_used -= len(self._memory.pop(key))
+        self._memory[key] = value
+        self._memory_used += len(value)
+        while self._memory_used > self.memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_used -= len(evicted)
+            self._counters['memory_evictions'] += 1
+
+    def get(self, key):
+        path = self._path(key)
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self._counters['memory_hits'] += 1
+                return self._memory[key]
+
+        try:
+            value = path.read_bytes()
+            os.utime(path)
+        except FileNotFoundError:
+            with self._lock:
+                self._counters['misses'] += 1
+            return None
+
+        with self._lock:
+            self._counters['disk_hits'] += 1
+            self._remember(key, value)
+        return value
+
+    def put(self, key, value):
+        path = self._path(key)
+        with self._lock:
+            self._remember(key, value)
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f'{path.name}.{os.getpid()}.{threading.get_ident()}.tmp')
+        tmp.write_bytes(value)
+        os.replace(tmp, path)
+        self._prune_disk()
+
+    def get_or_create(self, key, create):
+        value = self.get(key)
+        if value is None:
+            value = create()
+            self.put(key, value)
+        return value
+
+    def _prune_disk(self):
+        entries = []
+        for path in self.directory.glob(f'*{self.suffix}'):
+            try:
+                st = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+
+        used = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if used <= self.disk_bytes:
+                break
+            path.unlink(missing_ok=True)
+            used -= size
+            with self._lock:
+                self._counters['disk_evictions'] += 1
+
+    def stats(self):
+        with self._lock:
+            hits = self._counters['memory_hits'] + self._counters['disk_hits']
+            lookups = hits + self._counters['misses']
+            return {
+                **self._counters,
+                'hit_rate': hits / lookups if lookups else 0.0,
+                'memory_entries': len(self._memory),
+                'memory_bytes': self._memory_used
+            }
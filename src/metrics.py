@@ -0,0 +1,225 @@
+"""Prometheus metrics for the dashboard's callbacks, caches and memory.
+
+`register_metrics(app)` serves them at `/metrics`. Every Dash callback
+request is timed end to end and its response size recorded, before and
+after compression (see `src.payloads`), labelled with the callback's
+function name. Callbacks decorated with `instrumented` also
+break their time down by stage: code inside `with stage('filter'):` is
+recorded under that stage, and the time from the callback returning to the
+response leaving Dash, mostly JSON serialization, under `serialize`.
+Background jobs collect their stages with `collect_stages` and queue them
+with `src.jobs.report_job`; they are recorded when `/metrics` is served. Requests dropped because a newer one
+replaced them (see `src.coalescing`) are counted by callback and by the last
+stage they finished. Cache counters and process memory
+are read when the endpoint is scraped.
+
+Metrics are per process; with several workers, scrape each one. Without
+`prometheus_client` installed, `instrumented` and `stage` do nothing and no
+route is added.
+"""
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from flask import Response, g, request
+
+try:
+    from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, Counter, Histogram, generate_latest
+    from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+except ImportError:  # metrics are optional
+    REGISTRY = None
+
+from src.startup import memory_mb
+
+logger = logging.getLogger(__name__)
+
+ROUTE = '/metrics'
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+BYTES_BUCKETS = tuple(256 * 4 ** i for i in range(10))  # 256 B to 64 MB
+
+# caches reported at scrape time, by name; anything with a TwoTierLRU-style stats()
+CACHES = {}
+
+_request = threading.local()
+
+if REGISTRY is not None:
+    CALLBACK_SECONDS = Histogram(
+        'dashboard_callback_seconds', "Wall time of Dash callback requests",
+        ['callback'], buckets=LATENCY_BUCKETS
+    )
+    STAGE_SECONDS = Histogram(
+        'dashboard_callback_stage_seconds', "Wall time of each stage of a callback",
+        ['callback', 'stage'], buckets=LATENCY_BUCKETS
+    )
+    RESPONSE_BYTES = Histogram(
+        'dashboard_callback_response_bytes', "Size of Dash callback responses as sent",
+        ['callback'], buckets=BYTES_BUCKETS
+    )
+    UNCOMPRESSED_BYTES = Histogram(
+        'dashboard_callback_uncompressed_bytes', "Size of Dash callback responses before compression",
+        ['callback'], buckets=BYTES_BUCKETS
+    )
+    JOB_SECONDS = Histogram(
+        'dashboard_job_seconds', "Wall time of background callback jobs",
+        ['callback'], buckets=LATENCY_BUCKETS
+    )
+    SKIPPED = Counter(
+        'dashboard_callback_skipped', "Callback requests dropped because a newer one replaced them",
+        ['callback', 'stage']
+    )
+
+
+def watch_cache(name, cache):
+    """Report `cache.stats()` on `/metrics` under `cache=name`."""
+    CACHES[name] = cache
+
+
+def instrumented(func):
+    """Time `func`'s stages when it runs as a Dash callback."""
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        state = getattr(_request, 'state', None)
+        if state is None:
+            return func(*args, **kwargs)
+        state['instrumented'] = True
+        try:
+            return func(*args, **kwargs)
+        finally:
+            state['returned'] = time.perf_counter()
+
+    return wrapper
+
+
+@contextmanager
+def stage(name):
+    """Add the block's wall time to stage `name` of the current callback."""
+    state = getattr(_request, 'state', None)
+    if state is None:
+        yield
+        return
+    if state.get('on_stage'):
+        state['on_stage'](name)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        state['stages'][name] = state['stages'].get(name, 0.0) + time.perf_counter() - start
+
+
+@contextmanager
+def collect_stages(on_stage=None):
+    """Collect `stage` timings outside a request, e.g. in a background job.
+
+    Yields the dict of stage name -> seconds; `on_stage(name)` is called as
+    each stage starts.
+    """
+    previous = getattr(_request, 'state', None)
+    _request.state = {'stages': {}, 'on_stage': on_stage}
+    try:
+        yield _request.state['stages']
+    finally:
+        _request.state = previous
+
+
+def observe_skipped(callback, stage_name):
+    """Count a request of `callback` dropped after finishing `stage_name`."""
+    if REGISTRY is not None:
+        SKIPPED.labels(callback, stage_name).inc()
+
+
+def observe_job(callback, seconds, stages):
+    """Record a finished background job of `callback` and its stages."""
+    if REGISTRY is None:
+        return
+    JOB_SECONDS.labels(callback).observe(seconds)
+    for stage_name, stage_seconds in stages.items():
+        STAGE_SECONDS.labels(callback, stage_name).observe(stage_seconds)
+
+
+class CacheCollector:
+    """Cache counters, dataset size and process memory, read on each scrape."""
+
+    def collect(self):
+        hits = CounterMetricFamily('dashboard_cache_hits', "Cache hits", labels=['cache', 'tier'])
+        misses = CounterMetricFamily('dashboard_cache_misses', "Cache misses", labels=['cache'])
+        evictions = CounterMetricFamily('dashboard_cache_evictions', "Cache evictions", labels=['cache', 'tier'])
+        entries = GaugeMetricFamily('dashboard_cache_entries', "Entries in a cache's memory tier", labels=['cache'])
+        size = GaugeMetricFamily('dashboard_cache_bytes', "Bytes in a cache's memory tier", labels=['cache'])
+        for name, cache in CACHES.items():
+            stats = cache.stats()
+            for tier in ('memory', 'disk'):
+                hits.add_metric([name, tier], stats[f'{tier}_hits'])
+                evictions.add_metric([name, tier], stats[f'{tier}_evictions'])
+            misses.add_metric([name], stats['misses'])
+            entries.add_metric([name], stats['memory_entries'])
+            size.add_metric([name], stats['memory_bytes'])
+        yield from (hits, misses, evictions, entries, size)
+
+        memory = memory_mb()
+        if memory is not None:
+            yield GaugeMetricFamily('dashboard_memory_bytes', "Resident memory of this process", value=memory * 2**20)
+
+        # imported here so that scraping never triggers a dataset load
+        from src.data import dataset_report
+        report = dataset_report()
+        if report:
+            yield GaugeMetricFamily('dashboard_dataset_rows', "Rows in the loaded dataset", value=report['rows'])
+            yield GaugeMetricFamily('dashboard_dataset_bytes', "Memory held by the loaded dataset",
+                                    value=report['memory_bytes'])
+
+
+def serve_metrics():
+    # imported here so that importing metrics never touches the job store
+    from src.jobs import pending_job_reports
+    for report in pending_job_reports():
+        observe_job(report['callback'], report['seconds'], report['stages'])
+    return Response(generate_latest(REGISTRY), content_type=CONTENT_TYPE_LATEST)
+
+
+def register_metrics(app):
+    """Time `app`'s callback requests and serve the registry at `/metrics`."""
+    if REGISTRY is None:
+        logger.info("prometheus_client is not installed; %s is disabled", ROUTE)
+        return
+
+    server = app.server
+    update_path = app.config.routes_pathname_prefix + '_dash-update-component'
+
+    def callback_name(body):
+        callback = app.callback_map.get((body or {}).get('output'), {}).get('callback')
+        return getattr(callback, '__name__', 'unknown')
+
+    @server.before_request
+    def start_timer():
+        if request.path == update_path:
+            _request.state = {'start': time.perf_counter(), 'stages': {}}
+
+    @server.after_request
+    def record_callback(response):
+        state = getattr(_request, 'state', None)
+        if state is None or request.path != update_path:
+            return response
+        _request.state = None
+
+        now = time.perf_counter()
+        name = callback_name(request.get_json(silent=True))
+        CALLBACK_SECONDS.labels(name).observe(now - state['start'])
+        sent = response.calculate_content_length() or 0
+        RESPONSE_BYTES.labels(name).observe(sent)
+        UNCOMPRESSED_BYTES.labels(name).observe(g.get('uncompressed_bytes', sent))
+        # a PreventUpdate (204) has nothing serialized; its stages would skew the histograms
+        if state.get('instrumented') and response.status_code != 204:
+            stages = dict(state['stages'])
+            if 'returned' in state:
+                # compression runs in its own after_request hook, before this one
+                stages['serialize'] = now - state['returned'] - stages.get('compress', 0.0)
+            for stage_name, seconds in stages.items():
+                STAGE_SECONDS.labels(name, stage_name).observe(seconds)
+        return response
+
+    REGISTRY.register(CacheCollector())
+    server.add_url_rule(ROUTE, 'metrics', serve_metrics)
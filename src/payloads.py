@@ -0,0 +1,110 @@
+"""Compact figure arrays and compressed responses for Dash callbacks.
+
+Plotly sends numpy arrays as base64 typed arrays, but only in dtypes that
+plotly.js has. Int64 columns such as `video_id` fall back to nested JSON
+lists, and float64 curves spend eight bytes on values four bytes draw just
+as well. `compact_figure(fig)` narrows a figure's trace arrays so that all
+of them go out typed. Integers get the smallest dtype that holds them, or
+doubles past 32 bits, which stay exact below 2**53. Float coordinates
+become float32, and single-column `customdata` is flattened to one value per
+point. Category labels are already sent once per trace, as trace names,
+rather than per point.
+
+`register_compression(app)` then compresses callback responses for clients
+that accept it, with brotli or gzip. It uses fast levels, since each response
+is compressed once. The size before compression is left in
+`flask.g.uncompressed_bytes`, so that `/metrics` reports callback bytes both
+before and after.
+"""
+import gzip
+
+import brotli
+import numpy as np
+from flask import g, request
+
+from src.metrics import stage
+
+# smallest first; plotly.js has no 64-bit integer arrays
+INTEGER_DTYPES = [np.uint8, np.int8, np.uint16, np.int16, np.uint32, np.int32]
+
+COORDINATE_ATTRIBUTES = ('x', 'y', 'z')
+
+# responses smaller than this are not worth a compression pass
+COMPRESS_MIN_BYTES = 1024
+
+# offered in order of preference
+CODINGS = ('br', 'gzip')
+
+# per coding: level for responses compressed once per request, and for cached payloads
+LEVELS = {'br': (4, 11), 'gzip': (1, 9)}
+
+
+def narrow_integers(values):
+    """`values` in the smallest integer dtype plotly.js can decode."""
+    if values.size == 0:
+        return values.astype(np.uint8)
+    lo, hi = values.min(), values.max()
+    for dtype in INTEGER_DTYPES:
+        info = np.iinfo(dtype)
+        if info.min <= lo and hi <= info.max:
+            return values.astype(dtype)
+    return values.astype(np.float64)
+
+
+def compact_array(values, coordinate=False):
+    if not isinstance(values, np.ndarray):
+        return values
+    if values.dtype.kind in 'iu':
+        return narrow_integers(values)
+    if coordinate and values.dtype == np.float64:
+        return values.astype(np.float32)
+    return values
+
+
+def compact_figure(fig):
+    """Narrow `fig`'s trace arrays in place so that plotly sends them typed."""
+    for trace in fig.data:
+        for attr in COORDINATE_ATTRIBUTES:
+            if attr in trace and trace[attr] is not None:
+                trace[attr] = compact_array(trace[attr], coordinate=True)
+        customdata = trace['customdata'] if 'customdata' in trace else None
+        if isinstance(customdata, np.ndarray):
+            if customdata.ndim == 2 and customdata.shape[1] == 1:
+                customdata = customdata[:, 0]
+            trace['customdata'] = compact_array(customdata)
+    return fig
+
+
+def preferred_coding(offered):
+    """First of `offered` codings the request accepts, or 'identity'."""
+    return next((coding for coding in offered if request.accept_encodings[coding]), 'identity')
+
+
+def compress(body, coding, cached=False):
+    """`body` compressed with `coding`; `cached` trades speed for size."""
+    level = LEVELS[coding][cached]
+    if coding == 'br':
+        return brotli.compress(body, quality=level)
+    return gzip.compress(body, compresslevel=level, mtime=0)
+
+
+def register_compression(app):
+    """Compress `app`'s callback responses for clients that accept it."""
+    update_path = app.config.routes_pathname_prefix + '_dash-update-component'
+
+    @app.server.after_request
+    def compress_callback(response):
+        if (request.path != update_path or response.status_code != 200
+                or response.direct_passthrough or response.content_encoding):
+            return response
+        body = response.get_data()
+        g.uncompressed_bytes = len(body)
+        coding = preferred_coding(CODINGS)
+        if len(body) < COMPRESS_MIN_BYTES or coding == 'identity':
+            return response
+
+        with stage('compress'):
+            response.set_data(compress(body, coding))
+        response.content_encoding = coding
+        response.vary.add('Accept-Encoding')
+        return response
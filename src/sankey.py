@@ -0,0 +1,186 @@
+"""Shared builder for the content journey Sankey diagram.
+
+Used by the home page and the `src.content_journey_sankey` export. Each stage
+is reduced to integer codes, so every pair of adjacent stages is counted with
+a single `np.bincount` and node ids and link colours are array lookups. The
+default stages can also be drawn straight from the ingest step's segment
+count cube, without reading rows.
+"""
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+DEFAULT_STAGES = ['claim_status', 'verified_status', 'author_ban_status']
+
+tiktok_colors = {
+    'pink': '#FF0050',
+    'aqua': '#00F2EA',
+    'black': '#000000',
+    'gray': '#333333',
+    'white': '#FFFFFF',
+    'magenta': '#de8c9d',
+    'blue': '#397684'
+}
+
+# links are coloured by the node they leave ...
+flow_colors = {
+    'claim': tiktok_colors['magenta'],
+    'opinion': tiktok_colors['blue'],
+    'not verified': tiktok_colors['pink'],
+    'verified': tiktok_colors['aqua']
+}
+
+# ... unless the node they enter is a moderation outcome
+outcome_colors = {
+    'under review': '#FFA500',
+    'banned': '#8B0000'
+}
+
+
+def duration_buckets(step=10, upper=60):
+    """Stage spec that bins `video_duration_sec` into `step`-second buckets."""
+    edges = list(range(0, upper + step, step))
+    labels = [f'{lo}-{hi}s' for lo, hi in zip(edges[:-1], edges[1:])]
+    return ('video_duration_sec', edges, labels)
+
+
+def stage_codes(df, stage):
+    """Integer codes (-1 for missing) and node labels for one stage.
+
+    A stage is either a column name or a `(column, bins, labels)` tuple, which
+    bins a numeric column with `pd.cut` and keeps the bin labels verbatim.
+    """
+    if isinstance(stage, tuple):
+        col, bins, labels = stage
+        values = pd.cut(df[col], bins=bins, labels=labels, include_lowest=True)
+        values = values.cat.remove_unused_categories()
+        return values.cat.codes.to_numpy(), [str(label) for label in values.cat.categories]
+
+    values = df[stage]
+    if not isinstance(values.dtype, pd.CategoricalDtype):
+        values = values.astype('category')
+    values = values.cat.remove_unused_categories()
+    return values.cat.codes.to_numpy(), [str(label).title() for label in values.cat.categories]
+
+
+def links_from_tables(stage_sizes, tables):
+    """Flatten adjacent-stage contingency tables into link arrays.
+
+    `tables[i]` is the `(stage_sizes[i], stage_sizes[i + 1])` count table
+    between stage i and stage i + 1; node ids run through the stages in order.
+    """
+    offsets = np.concatenate([[0], np.cumsum(stage_sizes)])
+    source, target, value = [], [], []
+    for i, table in enumerate(tables):
+        n_b = stage_sizes[i + 1]
+        cells = np.flatnonzero(table)
+        source.append(offsets[i] + cells // n_b)
+        target.append(offsets[i + 1] + cells % n_b)
+        value.append(table.ravel()[cells])
+
+    if not source:
+        empty = np.array([], dtype=np.int64)
+        return empty, empty, empty
+    return np.concatenate(source), np.concatenate(target), np.concatenate(value)
+
+
+def sankey_links(df, stages=DEFAULT_STAGES):
+    """Node labels plus link source, target and value arrays for `stages`."""
+    codes, labels, sizes = [], [], []
+    for stage in stages:
+        stage_code, stage_labels = stage_codes(df, stage)
+        codes.append(stage_code)
+        labels.extend(stage_labels)
+        sizes.append(len(stage_labels))
+
+    tables = []
+    for i in range(len(stages) - 1):
+        a, b = codes[i], codes[i + 1]
+        valid = (a >= 0) & (b >= 0)
+        table = np.bincount(a[valid].astype(np.int64) * sizes[i + 1] + b[valid],
+                            minlength=sizes[i] * sizes[i + 1])
+        tables.append(table.reshape(sizes[i], sizes[i + 1]))
+    return (labels, *links_from_tables(sizes, tables))
+
+
+def counts_links(levels, counts):
+    """Like `sankey_links`, but from a precomputed count cube.
+
+    `counts` has one axis per stage (in order) with `levels[i]` labels on
+    axis i, such as the ingest step's segment counts; each adjacent-stage
+    table is the cube summed over every other axis.
+    """
+    ndim = counts.ndim
+    tables = [
+        counts.sum(axis=tuple(a for a in range(ndim) if a not in (i, i + 1)))
+        for i in range(ndim - 1)
+    ]
+    # drop levels that never occur, as stage_codes does for frames
+    keep = [counts.sum(axis=tuple(a for a in range(ndim) if a != i)) > 0 for i in range(ndim)]
+    tables = [table[np.ix_(keep[i], keep[i + 1])] for i, table in enumerate(tables)]
+    labels = [str(label).title()
+              for i, stage_levels in enumerate(levels)
+              for label, present in zip(stage_levels, keep[i]) if present]
+    return (labels, *links_from_tables([int(k.sum()) for k in keep], tables))
+
+
+def link_colors(labels, source, target):
+    keys = [label.lower() for label in labels]
+    leaving = np.array([flow_colors.get(k, tiktok_colors['gray']) for k in keys], dtype=object)
+    entering = np.array([outcome_colors.get(k, '') for k in keys], dtype=object)
+    colors = entering[target]
+    fallback = colors == ''
+    colors[fallback] = leaving[source[fallback]]
+    return colors
+
+
+def create_sankey_figure(df, stages=DEFAULT_STAGES, **layout):
+    """Sankey of how rows flow through `stages`; `layout` overrides the defaults."""
+    if df.empty:
+        return go.Figure()
+    return sankey_figure(*sankey_links(df, stages), **layout)
+
+
+def create_sankey_figure_from_counts(levels, counts, **layout):
+    """Sankey of a count cube with one axis per stage (see `counts_links`)."""
+    if counts.sum() == 0:
+        return go.Figure()
+    return sankey_figure(*counts_links(levels, counts), **layout)
+
+
+def sankey_figure(labels, source, target, value, **layout):
+    """Styled Sankey figure from node labels and link arrays."""
+    fig = go.Figure(go.Sankey(
+        node=dict(
+            pad=20,
+            thickness=25,
+            line=dict(color=tiktok_colors['black'], width=0.8),
+            label=labels,
+            color=tiktok_colors['gray'],
+            hovertemplate='%{label}<extra></extra>'
+        ),
+        link=dict(
+            source=source,
+            target=target,
+            value=value,
+            color=link_colors(labels, source, target),
+            hovertemplate='From %{source.label}<br>To %{target.label}<br>Count: %{value}<extra></extra>'
+        )
+    ))
+
+    fig.update_layout(
+        font_family='Garamond, serif',
+        font_size=18,
+        font_color=tiktok_colors['white'],
+        paper_bgcolor=tiktok_colors['black'],
+        plot_bgcolor=tiktok_colors['black'],
+        height=720,
+        margin=dict(l=30, r=30, b=30, t=30, autoexpand=False),
+        hoverlabel=dict(
+            font_family='Garamond',
+            bgcolor=tiktok_colors['black'],
+            font_color=tiktok_colors['white']
+        )
+    )
+    fig.update_layout(**layout)
+    return fig
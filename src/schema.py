@@ -0,0 +1,78 @@
+"""Column layout, dtypes and NaN policy of the cleaned TikTok dataset."""
+import numpy as np
+import pandas as pd
+
+CATEGORICAL_COLUMNS = ['claim_status', 'verified_status', 'author_ban_status']
+
+COUNT_COLUMNS = [
+    'video_duration_sec',
+    'video_view_count',
+    'video_like_count',
+    'video_share_count',
+    'video_download_count',
+    'video_comment_count'
+]
+
+# fixed so that every chunk of a streamed build shares one schema
+COUNT_DTYPES = {col: 'uint32' for col in COUNT_COLUMNS}
+COUNT_DTYPES['video_duration_sec'] = 'uint16'
+
+ID_COLUMN = 'video_id'
+
+TEXT_COLUMN = 'video_transcription_text'
+
+COLUMNS = ['claim_status', ID_COLUMN, 'video_duration_sec', TEXT_COLUMN,
+           'verified_status', 'author_ban_status', 'video_view_count',
+           'video_like_count', 'video_share_count', 'video_download_count',
+           'video_comment_count']
+
+# view-count tiers used as the engagement dimension of aggregated segments
+VIEW_TIER_EDGES = [0, 1_000, 10_000, 100_000, 500_000, np.inf]
+VIEW_TIER_LABELS = ['< 1K', '1K-10K', '10K-100K', '100K-500K', '500K+']
+VIEW_TIER_COLUMN = 'view_tier'
+
+SEGMENT_COLUMNS = CATEGORICAL_COLUMNS + [VIEW_TIER_COLUMN]
+
+
+def view_tiers(views):
+    return pd.cut(views, bins=VIEW_TIER_EDGES, labels=VIEW_TIER_LABELS, right=False)
+
+
+def check_range(values, dtype):
+    """Raise ValueError if `values` do not fit integer `dtype`; a cast would wrap them."""
+    info = np.iinfo(dtype)
+    if len(values) and (values.min() < info.min or values.max() > info.max):
+        raise ValueError(
+            f"{values.name} ranges from {values.min()} to {values.max()}, "
+            f"outside the {dtype} it is stored as"
+        )
+
+
+def clean_dataset(df, categories=None):
+    """Apply the dashboard-wide dtypes and NaN policy to a raw frame.
+
+    Rows without a claim status carry no transcript and no engagement counts,
+    so they are dropped here instead of being filtered ad hoc by each page.
+    Categories keep their order of first appearance. Passing a `categories`
+    dict ({column: [values]}) shares it across calls: it is extended in place
+    with unseen values, so chunks of one file get consistent codes. Counts
+    outside their fixed dtype raise ValueError rather than wrap.
+    """
+    categories = {} if categories is None else categories
+    df = df.dropna(subset=['claim_status'] + COUNT_COLUMNS)
+
+    cleaned = {}
+    for col in COLUMNS:
+        values = df[col]
+        if col in CATEGORICAL_COLUMNS:
+            known = categories.setdefault(col, [])
+            seen = set(known)
+            known.extend(v for v in pd.unique(values.dropna()) if v not in seen)
+            values = pd.Categorical(values, categories=known)
+        elif col in COUNT_DTYPES:
+            check_range(values, COUNT_DTYPES[col])
+            values = values.astype(COUNT_DTYPES[col])
+        elif col == TEXT_COLUMN:
+            values = values.fillna('')
+        cleaned[col] = values
+    return pd.DataFrame(cleaned).reset_index(drop=True)
@@ -0,0 +1,122 @@
+"""Worker boot timing and lazily built, cached page layouts.
+
+`app.py` marks each boot phase with `mark` and logs `startup_report()` once
+the server is ready. Pages wrap their layout in `cached_layout`, so nothing
+is read or drawn at import: each layout is built on its first request,
+timed into the same report, and reused until a new snapshot is published.
+"""
+import logging
+import sys
+import time
+from functools import wraps
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+# libraries that pages should only import once they need them
+HEAVY_MODULES = ['matplotlib', 'wordcloud', 'scipy', 'plotly.express']
+
+_start = time.perf_counter()
+_last = _start
+_phases = []
+_layouts = {}
+
+
+def memory_mb():
+    """Resident memory of this process in MB, or None where unavailable."""
+    try:
+        with open('/proc/self/statm') as f:
+            pages = int(f.read().split()[1])
+        return pages * resource.getpagesize() / 2**20
+    except (OSError, AttributeError):
+        pass
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    return peak / 2**20 if sys.platform == 'darwin' else peak / 2**10
+
+
+def mark(phase):
+    """Record the time since the previous mark as `phase`."""
+    global _last
+    now = time.perf_counter()
+    _phases.append({'phase': phase, 'seconds': now - _last, 'memory_mb': memory_mb()})
+    _last = now
+
+
+def startup_report():
+    """Boot phases, total boot time, heavy modules loaded and first layout builds."""
+    return {
+        'phases': list(_phases),
+        'boot_seconds': _last - _start,
+        'memory_mb': memory_mb(),
+        'heavy_modules': [name for name in HEAVY_MODULES if name in sys.modules],
+        'layouts': dict(_layouts)
+    }
+
+
+def log_startup_report():
+    report = startup_report()
+    for phase in report['phases']:
+        logger.info("startup %-10s %6.3fs  %6.1f MB", phase['phase'], phase['seconds'], phase['memory_mb'] or 0)
+    logger.info(
+        "worker ready in %.3fs (%.1f MB); heavy modules loaded: %s",
+        report['boot_seconds'], report['memory_mb'] or 0, ', '.join(report['heavy_modules']) or 'none'
+    )
+
+
+def cached_layout(func):
+    """Build a page layout on first request and reuse it for the current snapshot.
+
+    Query-string arguments Dash passes to layout functions are ignored, since
+    the dashboard's layouts do not depend on them.
+    """
+    # imported here so that importing this module first stays cheap
+    from src.data import dataset_fingerprint
+
+    built = {}
+
+    @wraps(func)
+    def layout(**kwargs):
+        fingerprint = dataset_fingerprint()
+        if built.get('fingerprint') != fingerprint:
+            start = time.perf_counter()
+            built['layout'] = func()
+            built['fingerprint'] = fingerprint
+            seconds = time.perf_counter() - start
+            if func.__module__ not in _layouts:
+                _layouts[func.__module__] = seconds
+                logger.info("built %s layout in %.3fs", func.__module__, seconds)
+        return built['layout']
+
+    return layout
+
+
+def main():
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="Boot the app once and print its startup report.")
+    parser.add_argument('--pages', action='store_true', help="also build every page layout, as first requests would")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    import app  # noqa: F401
+    import dash
+
+    from src.startup import startup_report
+
+    if args.pages:
+        for page in dash.page_registry.values():
+            if callable(page['layout']):
+                page['layout']()
+    print(json.dumps(startup_report(), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""Figures that are the same for every visitor, served as pre-encoded JSON.
+
+The home Sankey and the default Duration Dynamics figure depend only on the
+dataset. Rather than embed them in each page layout response, `payload(name)`
+serializes each figure once per snapshot and keeps gzip and brotli variants
+in memory. The route at `/figures/<name>/<digest>.json` answers with the
+variant the client accepts. The URL carries a content digest, so responses
+are immutable and carry strong ETags: browsers and the reverse proxy reuse
+them, and conditional requests get a 304. A digest from an earlier snapshot
+redirects to the current one, so pages laid out before a swap keep their
+figures. Pages point a `dcc.Store` at `figure_url(name)` and
+`assets/figures.js` fetches the figure into the graph.
+
+Figures are narrowed with `compact_figure` first and encoded with orjson.
+"""
+import hashlib
+
+import plotly.io as pio
+from flask import Response, abort, redirect, request
+
+from src.content_journey_sankey import build_sankey_figure
+from src.data import dataset_fingerprint
+from src.duration_content_type_kde import build_duration_figure
+from src.payloads import CODINGS, compact_figure, compress, preferred_coding
+
+ROUTE = '/figures/<name>/<digest>.json'
+MIMETYPE = 'application/json'
+
+FIGURES = {
+    'sankey': build_sankey_figure,
+    'duration': build_duration_figure,
+}
+
+# shown until the browser has fetched the figure
+PLACEHOLDER = {
+    'data': [],
+    'layout': {
+        'paper_bgcolor': '#000000',
+        'plot_bgcolor': '#000000',
+        'xaxis': {'visible': False},
+        'yaxis': {'visible': False}
+    }
+}
+
+_payloads = {}
+
+
+def encode(body):
+    """`body` under each content coding offered, keyed by coding name."""
+    variants = {coding: compress(body, coding, cached=True) for coding in CODINGS}
+    variants['identity'] = body
+    return variants
+
+
+def payload(name):
+    """Digest and encoded variants of figure `name`, built once per snapshot."""
+    fingerprint = dataset_fingerprint()
+    cached = _payloads.get(name)
+    if cached is None or cached['fingerprint'] != fingerprint:
+        body = pio.to_json(compact_figure(FIGURES[name]()), validate=False, engine='orjson').encode()
+        cached = {
+            'fingerprint': fingerprint,
+            'digest': hashlib.blake2b(body, digest_size=16).hexdigest(),
+            'variants': encode(body)
+        }
+        _payloads[name] = cached
+    return cached
+
+
+def figure_url(name):
+    return ROUTE.replace('<name>', name).replace('<digest>', payload(name)['digest'])
+
+
+def serve_figure(name, digest):
+    if name not in FIGURES:
+        abort(404)
+    cached = payload(name)
+    if digest != cached['digest']:
+        return redirect(figure_url(name))
+
+    variants = cached['variants']
+    coding = preferred_coding(CODINGS)
+    response = Response(variants[coding], mimetype=MIMETYPE)
+    if coding != 'identity':
+        response.content_encoding = coding
+    response.vary.add('Accept-Encoding')
+    # each coding is a different representation, so it gets its own tag
+    response.set_etag(digest if coding == 'identity' else f'{digest}-{coding}')
+    response.cache_control.public = True
+    response.cache_control.max_age = 31536000
+    response.cache_control.immutable = True
+    return response.make_conditional(request)
+
+
+def register_routes(server):
+    server.add_url_rule(ROUTE, 'static_figure', serve_figure)
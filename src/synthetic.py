@@ -0,0 +1,288 @@
+"""Synthetic scrapes in the exact `tiktok_dataset.csv` format, at any size.
+
+    python -m src.synthetic ROWS [--out PATH] [--seed N] [--heavy-tail]
+
+The model is fitted to the public scrape:
+
+* (claim status, verified status, ban status) is drawn from their joint
+  frequencies, so dependencies such as claims being banned more often hold;
+  about 1.5% of rows lose their claim status, transcript and counts, as in
+  the real file, where missing counts are written as `#N/A`.
+* Duration is uniform over 5-60 seconds.
+* Views are uniform within a claim-status tier (claims reach 1M, opinions
+  10K). Likes, shares, downloads and comments follow as a multiplicative
+  chain, each a uniform fraction of the previous count. This reproduces the
+  real skew and the views/likes/shares correlations. `--heavy-tail` draws
+  views from a log-normal with the same medians instead, for stress tests
+  with a long tail.
+* Transcripts combine templated claim phrasings ("a friend read in the news
+  that ...") or opinion phrasings ("my family's view is that ...") with
+  one of a fixed set of facts.
+
+Rows are generated in fixed-size chunks, each from its own child of the
+seed, so the output depends only on the row count and the seed. Columns are
+NumPy arrays and CSV lines are assembled with Arrow string kernels, with no
+per-row Python.
+"""
+import argparse
+import logging
+import os
+import time
+from pathlib import Path
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+
+logger = logging.getLogger(__name__)
+
+CHUNK_ROWS = 1_000_000
+
+HEADER = ('#,claim_status,video_id,video_duration_sec,video_transcription_text,verified_status,'
+          'author_ban_status,video_view_count,video_like_count,video_share_count,'
+          'video_download_count,video_comment_count\n')
+
+# joint frequencies of (claim status, verified status, ban status) in the scrape
+SEGMENTS = [
+    ('claim', 'not verified', 'active', 0.3357),
+    ('claim', 'not verified', 'banned', 0.0743),
+    ('claim', 'not verified', 'under review', 0.0825),
+    ('claim', 'verified', 'active', 0.0083),
+    ('claim', 'verified', 'banned', 0.0012),
+    ('claim', 'verified', 'under review', 0.0015),
+    ('opinion', 'not verified', 'active', 0.4139),
+    ('opinion', 'not verified', 'banned', 0.0091),
+    ('opinion', 'not verified', 'under review', 0.0217),
+    ('opinion', 'verified', 'active', 0.0482),
+    ('opinion', 'verified', 'banned', 0.0012),
+    ('opinion', 'verified', 'under review', 0.0026),
+]
+
+MISSING_RATE = 0.0154
+
+DURATION_RANGE = (5, 60)
+
+# per claim status (claim, opinion): view range, then the upper bound of each
+# uniform ratio in the chain views -> likes -> shares / downloads -> comments
+VIEW_RANGES = [(1_000, 1_000_000), (20, 10_000)]
+LIKE_RATIO = [2 / 3, 4 / 9]
+SHARE_RATIO = [0.4, 0.4]
+DOWNLOAD_RATIO = [0.025, 0.025]
+COMMENT_RATIO = [2 / 3, 0.4]
+
+HEAVY_TAIL_SIGMA = 1.5
+
+# video ids are an affine permutation of the row number modulo a prime, so
+# they look scattered over ten digits and never repeat
+ID_BASE = 1_000_000_000
+ID_MODULUS = 8_999_999_993
+ID_MULTIPLIER = 2_654_435_761 % ID_MODULUS
+ID_INCREMENT = 1_234_567_891
+
+CLAIM_SOURCES = [
+    'someone shared with me', 'a friend mentioned', 'a colleague told me', 'the news told me',
+    'a friend read in the news', 'a colleague read in the media', 'someone read online',
+    'i learned from the media', 'i read on a website', 'a friend discovered on the radio',
+    'someone learned on an internet forum', 'a colleague located an article claiming',
+    'someone read a report mentioning', 'i learned in a discussion board a claim',
+    'a friend learned from the news a claim', 'my cousin saw on television',
+]
+
+OPINION_STANCES = [
+    'i think', 'i feel', 'i believe', 'i understand', 'i am willing to wager',
+    'my view is', 'my belief is', 'my impression is', 'my position is', 'our hypothesis is',
+    'my friends feel', 'my friends say', "my friends' view is", "my friends' opinion is",
+    'my family thinks', 'my family is willing to bet', "my family's view is", "my family's sentiment is",
+    'my colleagues think', 'my colleagues are convinced', "my colleagues' understanding is",
+    "my colleagues' point of view is",
+]
+
+FACTS = [
+    'honey never spoils if it is sealed and stored properly',
+    'octopuses have three hearts and blue blood',
+    'a day on venus is longer than a year on venus',
+    'bananas are botanically classified as berries',
+    'the eiffel tower grows taller in the summer heat',
+    'sharks existed before trees appeared on earth',
+    'a group of flamingos is called a flamboyance',
+    'the longest recorded flight of a chicken lasted thirteen seconds',
+    'there are more possible chess games than atoms in the observable universe',
+    'sound travels about four times faster in water than in air',
+    'the human nose can detect over one trillion different scents',
+    'wombats produce cube-shaped droppings',
+    'lightning strikes the earth about eight million times a day',
+    'the great wall of china is not visible from space with the naked eye',
+    'some turtles can breathe through their rear ends',
+    'the shortest war in history lasted less than an hour',
+    'cows have best friends and get stressed when they are separated',
+    'a teaspoon of neutron star material would weigh billions of tons',
+    'the moon has moonquakes that can last for hours',
+    'sloths can hold their breath longer than dolphins',
+    'the first oranges were green, not orange',
+    'there is enough gold in the earth\'s core to coat the planet',
+    'butterflies taste with their feet',
+    'the average cloud weighs more than a million pounds',
+    'scotland has more than four hundred words for snow',
+    'the inventor of the frisbee was turned into a frisbee after he died',
+    'koalas sleep up to twenty-two hours a day',
+    'the dot over the letter i is called a tittle',
+    'a bolt of lightning is five times hotter than the surface of the sun',
+    'saturn would float if you could find a bathtub big enough',
+    'the heart of a blue whale is the size of a small car',
+    'peanuts are not nuts, they grow underground as legumes',
+    'a single strand of spider silk is stronger than steel of the same width',
+    'the tongue print of every person is unique',
+    'hot water can freeze faster than cold water under some conditions',
+    'the pacific ocean is wider than the moon',
+    'most of the dust in homes comes from dead skin',
+    'more people visit france than any other country in the world',
+    'an ostrich\'s eye is bigger than its brain',
+    'the world\'s oldest known recipe is for beer',
+    'humans share about sixty percent of their genes with bananas',
+    'there are more trees on earth than stars in the milky way',
+    'the longest place name in the world has eighty-five letters',
+    'penguins propose to their mates with pebbles',
+    'the first computer bug was an actual moth stuck in a relay',
+    'drone deliveries will become common within a few years',
+    'a crocodile cannot stick its tongue out',
+    'the microwave oven was invented by accident',
+]
+
+
+def segment_table():
+    labels = np.array([segment[:3] for segment in SEGMENTS], dtype=object)
+    probabilities = np.array([segment[3] for segment in SEGMENTS])
+    return labels, probabilities / probabilities.sum()
+
+
+def video_ids(start, n_rows):
+    rows = np.arange(start, start + n_rows, dtype=np.int64)
+    return ID_BASE + (rows * ID_MULTIPLIER + ID_INCREMENT) % ID_MODULUS
+
+
+def generate_columns(rng, start, n_rows, heavy_tail=False):
+    """One chunk of the dataset as NumPy arrays (counts are float, NaN if missing)."""
+    labels, probabilities = segment_table()
+    segment = rng.choice(len(labels), size=n_rows, p=probabilities)
+    is_opinion = np.array([label[0] == 'opinion' for label in labels])[segment]
+    tier = is_opinion.astype(np.int64)
+
+    def per_tier(values):
+        return np.asarray(values)[tier]
+
+    lo, hi = np.array(VIEW_RANGES).T
+    if heavy_tail:
+        median = (lo + hi) / 2
+        views = per_tier(median) * np.exp(HEAVY_TAIL_SIGMA * rng.standard_normal(n_rows))
+        views = np.clip(np.rint(views), 0, 2**31 - 1)
+    else:
+        views = np.floor(rng.uniform(per_tier(lo), per_tier(hi)))
+    likes = np.floor(views * rng.uniform(0, per_tier(LIKE_RATIO)))
+    shares = np.floor(likes * rng.uniform(0, per_tier(SHARE_RATIO)))
+    downloads = np.floor(likes * rng.uniform(0, per_tier(DOWNLOAD_RATIO)))
+    comments = np.floor(downloads * rng.uniform(0, per_tier(COMMENT_RATIO)))
+
+    counts = np.stack([views, likes, shares, downloads, comments])
+    missing = rng.random(n_rows) < MISSING_RATE
+    counts[:, missing] = np.nan
+
+    return {
+        'row': np.arange(start + 1, start + n_rows + 1),
+        'segment': segment,
+        'is_opinion': is_opinion,
+        'missing': missing,
+        'video_id': video_ids(start, n_rows),
+        'duration': rng.integers(DURATION_RANGE[0], DURATION_RANGE[1] + 1, size=n_rows),
+        'source': rng.integers(len(CLAIM_SOURCES), size=n_rows),
+        'stance': rng.integers(len(OPINION_STANCES), size=n_rows),
+        'fact': rng.integers(len(FACTS), size=n_rows),
+        'counts': counts,
+    }
+
+
+def _strings(values):
+    return pc.cast(pa.array(values), pa.string())
+
+
+def _take(choices, index):
+    return pa.array(choices, pa.string()).take(pa.array(index))
+
+
+def csv_lines(columns):
+    """The chunk's CSV lines, joined into one buffer, in the scrape's format."""
+    labels, _ = segment_table()
+    segment = columns['segment']
+    missing = pa.array(columns['missing'])
+
+    claim_status = pc.if_else(missing, '', _take([label[0] for label in labels], segment))
+    verified = _take([label[1] for label in labels], segment)
+    banned = _take([label[2] for label in labels], segment)
+
+    # the text is quoted only when its fact contains a comma
+    quoted = np.array([',' in fact for fact in FACTS])[columns['fact']]
+    quote = _take(['', '"'], quoted.astype(np.int64))
+    phrase = pc.if_else(
+        pa.array(columns['is_opinion']),
+        _take(OPINION_STANCES, columns['stance']),
+        _take(CLAIM_SOURCES, columns['source'])
+    )
+    text = pc.binary_join_element_wise(quote, phrase, ' that ', _take(FACTS, columns['fact']), quote, '')
+    text = pc.if_else(missing, '', text)
+
+    counts = [
+        pc.if_else(missing, '#N/A', _strings(np.nan_to_num(values).astype(np.int64)))
+        for values in columns['counts']
+    ]
+    lines = pc.binary_join_element_wise(
+        _strings(columns['row']), claim_status, _strings(columns['video_id']),
+        _strings(columns['duration']), text, verified, banned, *counts, ','
+    )
+    lines = pc.binary_join_element_wise(lines, '', '\n')
+    offsets = np.frombuffer(lines.buffers()[1], np.int32)[lines.offset:lines.offset + len(lines) + 1]
+    return memoryview(lines.buffers()[2])[offsets[0]:offsets[-1]]
+
+
+def write_dataset(path, n_rows, seed=0, heavy_tail=False):
+    """Write an `n_rows` scrape to `path`; the same arguments give the same file."""
+    start_time = time.perf_counter()
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    n_chunks = -(-n_rows // CHUNK_ROWS)
+    seeds = np.random.SeedSequence(seed).spawn(n_chunks)
+
+    tmp = path.with_name(f'.{path.name}.{os.getpid()}.tmp')
+    try:
+        with open(tmp, 'wb') as f:
+            f.write(HEADER.encode())
+            for i, chunk_seed in enumerate(seeds):
+                start = i * CHUNK_ROWS
+                size = min(CHUNK_ROWS, n_rows - start)
+                columns = generate_columns(np.random.default_rng(chunk_seed), start, size, heavy_tail)
+                f.write(csv_lines(columns))
+        os.replace(tmp, path)
+    finally:
+        tmp.unlink(missing_ok=True)
+
+    logger.info("wrote %s rows to %s in %.1fs", f"{n_rows:,}", path, time.perf_counter() - start_time)
+    return path
+
+
+def main():
+    from src.data import DATA_PATH
+
+    parser = argparse.ArgumentParser(description="Write a synthetic scrape in the tiktok_dataset.csv format.")
+    parser.add_argument('rows', type=int, help="number of rows")
+    parser.add_argument('--out', help="output CSV (default: data/synthetic-<rows>-s<seed>.csv)")
+    parser.add_argument('--seed', type=int, default=0, help="random seed")
+    parser.add_argument('--heavy-tail', action='store_true', help="log-normal view counts")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    out = args.out or DATA_PATH.with_name(
+        f"synthetic-{args.rows}-s{args.seed}{'-heavy' if args.heavy_tail else ''}.csv"
+    )
+    write_dataset(out, args.rows, seed=args.seed, heavy_tail=args.heavy_tail)
+
+
+if __name__ == '__main__':
+    main()
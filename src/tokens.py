@@ -0,0 +1,88 @@
+"""Document-term counts for the transcription text.
+
+Transcripts are tokenized once, with the same rules `WordCloud.process_text`
+applies (minus bigram collocations), into a sparse rows x vocabulary count
+matrix. A filtered word cloud then sums the selected rows and feeds the
+result to `WordCloud.generate_from_frequencies`, so no text is joined or
+re-tokenized per request.
+"""
+import re
+from collections import Counter
+
+import numpy as np
+from scipy import sparse
+from wordcloud import STOPWORDS
+
+TOKEN_PATTERN = re.compile(r"\w[\w']*")
+
+DEFAULT_STOPWORDS = frozenset(word.lower() for word in STOPWORDS)
+
+
+def tokenize(text, stopwords=DEFAULT_STOPWORDS):
+    words = []
+    for word in TOKEN_PATTERN.findall(text.lower()):
+        if word.endswith("'s"):
+            word = word[:-2]
+        if word and not word.isdigit() and word not in stopwords:
+            words.append(word)
+    return words
+
+
+def count_documents(texts, positions, stopwords=DEFAULT_STOPWORDS):
+    """CSR count matrix for `texts` over the vocabulary in `positions`.
+
+    `positions` maps word to column and is extended in place with unseen
+    words, so successive chunks share column ids.
+    """
+    indptr, indices, data = [0], [], []
+    for text in texts:
+        counts = Counter(positions.setdefault(word, len(positions)) for word in tokenize(text, stopwords))
+        indices.extend(counts.keys())
+        data.extend(counts.values())
+        indptr.append(len(indices))
+    return sparse.csr_matrix(
+        (np.array(data, dtype=np.int32), np.array(indices, dtype=np.int32), np.array(indptr, dtype=np.int64)),
+        shape=(len(texts), len(positions))
+    )
+
+
+class TokenCounts:
+    """Sparse document-term count matrix over a text column."""
+
+    def __init__(self, vocabulary, matrix):
+        self.vocabulary = np.asarray(vocabulary, dtype=object)
+        self.matrix = sparse.csr_matrix(matrix, shape=(matrix.shape[0], len(self.vocabulary)))
+
+        # WordCloud folds "words" into "word" when both occur; keep a map from
+        # each plural to its singular so the same merge can run on any subset
+        positions = {word: i for i, word in enumerate(self.vocabulary)}
+        self.singular = np.array([
+            positions.get(word[:-1], -1) if word.endswith('s') and not word.endswith('ss') else -1
+            for word in self.vocabulary
+        ], dtype=np.int64)
+
+    @classmethod
+    def from_texts(cls, texts, stopwords=DEFAULT_STOPWORDS):
+        positions = {}
+        matrix = count_documents(texts, positions, stopwords)
+        return cls(list(positions), matrix)
+
+    def counts(self, rows=None):
+        """Summed term counts over `rows` (all rows when None)."""
+        matrix = self.matrix if rows is None else self.matrix[rows]
+        counts = np.asarray(matrix.sum(axis=0)).ravel().astype(np.int64)
+
+        plurals = np.flatnonzero(self.singular >= 0)
+        singulars = self.singular[plurals]
+        merge = (counts[plurals] > 0) & (counts[singulars] > 0)
+        np.add.at(counts, singulars[merge], counts[plurals[merge]])
+        counts[plurals[merge]] = 0
+        return counts
+
+    def frequencies(self, rows=None, top=None):
+        """{word: count} for `rows`, limited to the `top` most frequent words."""
+        counts = self.counts(rows)
+        present = np.flatnonzero(counts)
+        if top is not None and len(present) > top:
+            present = present[np.argpartition(counts[present], -top)[-top:]]
+        return dict(zip(self.vocabulary[present].tolist(), counts[present].tolist()))
@@ -0,0 +1,110 @@
+"""Word cloud rendering and the Flask route that serves the images.
+
+Clouds are drawn straight from the `WordCloud` bitmap to lossless WebP, with
+no matplotlib figure in between, and stored in a `TwoTierLRU` under a key
+derived from the filter state. Callbacks return only an `<img>` pointing at
+`/wordcloud/<key>.webp`; the route answers with a strong ETag and long-lived
+cache headers, since a key always maps to the same image.
+"""
+import io
+
+from flask import Response, abort, request
+
+from src.cache import CACHE_DIR
+from src.lru import KEY_PATTERN, TwoTierLRU
+from src.data import load_token_counts
+from src.metrics import stage, watch_cache
+
+ROUTE = '/wordcloud/<key>.webp'
+MIMETYPE = 'image/webp'
+
+tiktok_pink = '#FF0050'
+tiktok_aqua = '#00F2EA'
+tiktok_black = '#000000'
+
+# rendered clouds, shared across workers through the disk tier
+wordcloud_cache = TwoTierLRU(CACHE_DIR / 'wordcloud', suffix='.webp')
+watch_cache('wordcloud', wordcloud_cache)
+
+
+def make_tiktok_colormap():
+    from matplotlib.colors import LinearSegmentedColormap
+
+    colors = [tiktok_pink, tiktok_aqua, '#FFFFFF']
+    return LinearSegmentedColormap.from_list('tiktok', colors)
+
+
+def warm_renderer():
+    """Load the token counts and drawing modules a render needs.
+
+    Jobs run in a process forked per render, so whatever the parent has
+    loaded by then is inherited instead of loaded again in every job.
+    """
+    load_token_counts()
+    from wordcloud import WordCloud  # noqa: F401
+    make_tiktok_colormap()
+
+
+def render_wordcloud(rows):
+    """Lossless WebP of the cloud for `rows`; empty bytes if no words matched."""
+    # word counts come from the precomputed document-term matrix
+    with stage('aggregate'):
+        frequencies = load_token_counts().frequencies(rows, top=100)
+
+    if not frequencies:
+        return b''
+
+    with stage('render'):
+        return draw_wordcloud(frequencies)
+
+
+def draw_wordcloud(frequencies):
+    # wordcloud and matplotlib are only imported once a cloud is drawn
+    from wordcloud import WordCloud
+
+    try:
+        wordcloud = WordCloud(
+            width=1200,
+            height=600,
+            background_color=tiktok_black,
+            colormap=make_tiktok_colormap(),
+            max_words=100,
+            prefer_horizontal=0.9,
+            relative_scaling=0.5
+        ).generate_from_frequencies(frequencies)
+    except Exception:
+        # if colormap fails, fallback to default colormap
+        wordcloud = WordCloud(
+            width=1200,
+            height=600,
+            background_color=tiktok_black,
+            colormap='viridis',
+            max_words=100
+        ).generate_from_frequencies(frequencies)
+
+    buf = io.BytesIO()
+    wordcloud.to_image().save(buf, format='WEBP', lossless=True, method=4)
+    return buf.getvalue()
+
+
+def image_path(key):
+    return ROUTE.replace('<key>', key)
+
+
+def serve_wordcloud(key):
+    if not KEY_PATTERN.fullmatch(key):
+        abort(404)
+    image = wordcloud_cache.get(key)
+    if not image:
+        abort(404)
+
+    response = Response(image, mimetype=MIMETYPE)
+    response.set_etag(key)
+    response.cache_control.public = True
+    response.cache_control.max_age = 31536000
+    response.cache_control.immutable = True
+    return response.make_conditional(request)
+
+
+def register_routes(server):
+    server.add_url_rule(ROUTE, 'wordcloud_image', serve_wordcloud)